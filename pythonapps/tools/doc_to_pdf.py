@@ -3,12 +3,274 @@ import argparse
 import logging
 import json
 import os
+import re
+import shutil
+import hashlib
+import time
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, as_completed
+from itertools import zip_longest
 from pathlib import Path
 
 # Configure logging to display timestamps and log levels
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# A sheet's DataFrame (all cells as Python str objects) takes several times
+# the size of its uncompressed worksheet XML; used to estimate sheet memory
+SHEET_MEMORY_FACTOR = 4
+
+# How output for a sheet that duplicates an earlier one is materialized
+DEDUPE_MODES = ("link", "manifest", "off")
+
+# Longest a duplicate sheet waits for the sheet it duplicates before processing itself
+FINGERPRINT_WAIT_TIMEOUT = 3600
+
+# Longest a claim may stay without its owner's process id before the owner is presumed dead
+FINGERPRINT_CLAIM_GRACE = 10
+
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+XLSX_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+XLSX_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def parse_memory_size(text):
+    """
+    Parse a memory size such as "512M", "2G", "800K" or "1048576" into bytes.
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid memory size: {text!r} (use e.g. 512M or 2G)")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2).upper()])
+
+
+def peak_rss_bytes():
+    """
+    Report the peak resident set size of this process and of its finished child processes.
+    
+    Returns:
+        dict or None: {"main": bytes, "workers": bytes}, or None where the
+                      resource module isn't available (e.g. Windows)
+    """
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return {
+        "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    }
+
+
+def process_alive(pid):
+    """
+    True if a process with this id exists (or liveness can't be checked, e.g.
+    on Windows, where os.kill would terminate the process instead).
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+def link_or_copy(source_file, target_file):
+    """
+    Hardlink source_file to target_file (replacing it), copying where hardlinks aren't supported.
+    
+    Returns:
+        bool: True if linked, False if copied
+    """
+    if target_file.exists():
+        target_file.unlink()
+    try:
+        os.link(source_file, target_file)
+        return True
+    except OSError:
+        shutil.copy2(source_file, target_file)
+        return False
+
+
+def require_fpdf():
+    """
+    Import fpdf2 lazily; it is only needed when PDF rendering is requested.
+    """
+    try:
+        import fpdf
+    except ImportError as e:
+        raise ImportError("PDF rendering requires fpdf2 (pip install fpdf2)") from e
+    return fpdf
+
+
+class GroupPdfRenderer:
+    """
+    Renders group JSON files ({"GROUP_KEY": {field: [lines]}}) as paginated
+    two-column PDF tables (Field | Value).
+    
+    One renderer is created per worker process and reused for every document,
+    so the font registration settings, colors and column geometry are resolved
+    only once. Table rows are generated lazily from the group data and drawn one
+    text line at a time; no table structure is built for the whole group, and
+    the header row is repeated on every page.
+    """
+    
+    PAGE_FORMAT = "A4"
+    MARGIN = 12
+    TITLE_SIZE = 14
+    TEXT_SIZE = 9
+    LINE_HEIGHT = 5
+    FIELD_WIDTH_RATIO = 0.35
+    HEADER_FILL = (220, 228, 240)
+    BORDER_COLOR = (150, 150, 150)
+    
+    def __init__(self, font_file=None):
+        """
+        Args:
+            font_file: Optional TTF font for non-Latin text; the built-in
+                       Helvetica (Latin-1 only) is used otherwise
+        """
+        fpdf = require_fpdf()
+        from fpdf.enums import XPos, YPos, MethodReturnValue
+        
+        self.FPDF = fpdf.FPDF
+        self.XPos = XPos
+        self.YPos = YPos
+        self.LINES = MethodReturnValue.LINES
+        self.font_file = str(font_file) if font_file else None
+        self.font_family = "GroupFont" if self.font_file else "Helvetica"
+        # Core fonts only cover Latin-1; replace anything else instead of failing
+        self.encode_text = (lambda text: text) if self.font_file else (
+            lambda text: text.encode('latin-1', 'replace').decode('latin-1'))
+    
+    def new_document(self):
+        """Create an empty document with the cached style settings."""
+        pdf = self.FPDF(format=self.PAGE_FORMAT)
+        pdf.set_margins(self.MARGIN, self.MARGIN, self.MARGIN)
+        pdf.set_auto_page_break(False)
+        pdf.set_draw_color(*self.BORDER_COLOR)
+        if self.font_file:
+            pdf.add_font(self.font_family, "", self.font_file)
+            pdf.add_font(self.font_family, "B", self.font_file)
+        return pdf
+    
+    def iter_rows(self, element_data):
+        """
+        Yield (field, value) rows lazily: one row per content line, with the
+        field name only on the first line of each field.
+        """
+        for field_name, content_lines in element_data.items():
+            for line_index, content_line in enumerate(content_lines):
+                yield (field_name if line_index == 0 else ""), str(content_line)
+    
+    def draw_header(self, pdf, field_width, value_width):
+        """Draw the Field | Value header row."""
+        pdf.set_font(self.font_family, "B", self.TEXT_SIZE)
+        pdf.cell(field_width, self.LINE_HEIGHT + 1, "Field", border=1, fill=True)
+        pdf.cell(value_width, self.LINE_HEIGHT + 1, "Value", border=1, fill=True,
+                 new_x=self.XPos.LMARGIN, new_y=self.YPos.NEXT)
+        pdf.set_font(self.font_family, "", self.TEXT_SIZE)
+    
+    def render(self, json_file, pdf_file):
+        """
+        Render one group file to a PDF document.
+        
+        Returns:
+            int: Number of pages written
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            group_data = json.load(f)
+        
+        pdf = self.new_document()
+        pdf.set_fill_color(*self.HEADER_FILL)
+        field_width = pdf.epw * self.FIELD_WIDTH_RATIO
+        value_width = pdf.epw - field_width
+        
+        def start_page(title):
+            pdf.add_page()
+            pdf.set_font(self.font_family, "B", self.TITLE_SIZE)
+            pdf.cell(0, self.LINE_HEIGHT * 2, title, new_x=self.XPos.LMARGIN, new_y=self.YPos.NEXT)
+            self.draw_header(pdf, field_width, value_width)
+        
+        for group_key, element_data in group_data.items():
+            title = self.encode_text(str(group_key))
+            start_page(title)
+            
+            for field_name, value in self.iter_rows(element_data):
+                # Wrap both cells, then draw them line by line so long values flow across pages
+                field_lines = pdf.multi_cell(field_width, self.LINE_HEIGHT, self.encode_text(field_name),
+                                             dry_run=True, output=self.LINES) if field_name else []
+                value_lines = pdf.multi_cell(value_width, self.LINE_HEIGHT, self.encode_text(value),
+                                             dry_run=True, output=self.LINES)
+                
+                for line_index, (field_line, value_line) in enumerate(zip_longest(field_lines, value_lines, fillvalue="")):
+                    if pdf.get_y() + self.LINE_HEIGHT > pdf.page_break_trigger:
+                        # Close the table on this page and continue on the next
+                        pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + pdf.epw, pdf.get_y())
+                        start_page(title)
+                    border = "LTR" if line_index == 0 else "LR"
+                    pdf.cell(field_width, self.LINE_HEIGHT, field_line, border=border)
+                    pdf.cell(value_width, self.LINE_HEIGHT, value_line, border=border,
+                             new_x=self.XPos.LMARGIN, new_y=self.YPos.NEXT)
+            
+            # Bottom border of the table
+            pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + pdf.epw, pdf.get_y())
+        
+        if not pdf.page_no():
+            start_page("")
+        pdf.output(str(pdf_file))
+        return pdf.page_no()
+
+
+# Per-process renderer cache: font_file -> GroupPdfRenderer
+RENDERER_CACHE = {}
+
+
+def render_group_pdf(json_file, pdf_file, font_file=None):
+    """
+    Worker entry point for the PDF stage: render one group file with this
+    process's cached renderer.
+    
+    Returns:
+        int: Number of pages written
+    """
+    renderer = RENDERER_CACHE.get(font_file)
+    if renderer is None:
+        renderer = RENDERER_CACHE[font_file] = GroupPdfRenderer(font_file)
+    os.makedirs(Path(pdf_file).parent, exist_ok=True)
+    return renderer.render(json_file, pdf_file)
+
+
+def process_sheet_worker(processor_config, sheet_identifier):
+    """
+    Worker entry point for memory budget mode: load, process and release ONE sheet.
+    
+    Runs in a separate process so the sheet's memory is returned to the system
+    as soon as the worker moves on.
+    
+    Returns:
+        tuple: (sheet_identifier, status, duplicate_record) where status is
+               "processed", "failed" or "skipped"
+    """
+    processor = DataTableProcessor(**processor_config)
+    sheet_data = processor.load_data_sheet(sheet_identifier)
+    if sheet_data is None:
+        return sheet_identifier, "skipped", None
+    success, duplicate_record = processor.process_sheet(sheet_identifier, sheet_data)
+    del sheet_data
+    return sheet_identifier, "processed" if success else "failed", duplicate_record
+
 
 class DataTableProcessor:
     """
@@ -56,7 +318,13 @@ class DataTableProcessor:
                  horizontal_file_prefix="H_",
                  vertical_file_prefix="V_",
                  horizontal_data_suffix="",
-                 vertical_data_suffix=""):
+                 vertical_data_suffix="",
+                 max_memory=None,
+                 max_workers=None,
+                 render_pdf=False,
+                 pdf_workers=None,
+                 pdf_font=None,
+                 dedupe="link"):
         """
         Initialize the processor with configuration parameters.
         
@@ -97,6 +365,27 @@ class DataTableProcessor:
                                   
             vertical_data_suffix: Suffix appended to group keys in vertical JSON output
                                 - e.g., if suffix="_DATA" and key="2024", JSON key becomes "2024_DATA"
+            
+            max_memory: Memory budget in bytes for process-and-release mode (default: None)
+                      - None loads all sheets up front and processes them in this process
+                      - Otherwise every sheet is loaded, processed and released in a worker
+                        process, and only as many sheets run at once as fit the budget
+                        
+            max_workers: Maximum worker processes in memory budget mode (default: CPU count)
+            
+            render_pdf: Render every group JSON file as a PDF table document (default: False)
+                      - Requires fpdf2; PDFs mirror the JSON layout under output_directory/pdf_groups
+                      
+            pdf_workers: Worker processes for PDF rendering (default: CPU count)
+            
+            pdf_font: Optional TTF font file for PDF text outside Latin-1
+            
+            dedupe: How sheets with identical content are handled (default: "link")
+                  - Each sheet is fingerprinted (content + effective configuration);
+                    only the first sheet with a fingerprint is processed
+                  - "link": duplicates get hardlinks to its files (copies if linking fails)
+                  - "manifest": duplicates get no files, only a reference in the summary
+                  - "off": every sheet is processed
         """
         # Convert paths to Path objects for better cross-platform compatibility
         self.source_file = Path(source_file)
@@ -116,6 +405,22 @@ class DataTableProcessor:
         self.horizontal_data_suffix = horizontal_data_suffix
         self.vertical_data_suffix = vertical_data_suffix
         
+        # Store memory budget configuration
+        self.max_memory = max_memory
+        self.max_workers = max_workers
+        
+        # Store PDF rendering configuration; fail early if fpdf2 is missing
+        self.render_pdf = render_pdf
+        self.pdf_workers = pdf_workers
+        self.pdf_font = pdf_font
+        if render_pdf:
+            require_fpdf()
+        
+        # Store duplicate sheet handling
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(f"Unsupported dedupe mode: {dedupe} (choose from {', '.join(DEDUPE_MODES)})")
+        self.dedupe = dedupe
+        
         # Initialize containers for sheet data
         self.data_sheets = {}  # Dictionary to store DataFrames for each sheet
         self.sheet_identifiers = []  # List of sheet names in the Excel file
@@ -127,6 +432,8 @@ class DataTableProcessor:
         #   └── processing_summary.json
         self.horizontal_output_dir = self.output_directory / "horizontal_groups"
         self.vertical_output_dir = self.output_directory / "vertical_groups"
+        self.pdf_output_dir = self.output_directory / "pdf_groups"
+        self.fingerprint_dir = self.output_directory / ".fingerprints"
         os.makedirs(self.horizontal_output_dir, exist_ok=True)
         os.makedirs(self.vertical_output_dir, exist_ok=True)
         os.makedirs(self.output_directory, exist_ok=True)
@@ -183,31 +490,9 @@ class DataTableProcessor:
             
             # Iterate through each sheet and attempt to load it
             for sheet_id in self.sheet_identifiers:
-                try:
-                    logger.info(f"Loading data sheet: '{sheet_id}'")
-                    
-                    # Read sheet with specific parameters to preserve data integrity
-                    sheet_content = pd.read_excel(
-                        self.source_file,
-                        sheet_name=sheet_id,
-                        header=None,  # Don't automatically detect headers
-                        keep_default_na=False,  # Keep empty strings as-is
-                        dtype=str  # Read everything as string to preserve formatting
-                    )
-                    
-                    # Skip empty sheets
-                    if sheet_content.empty:
-                        logger.warning(f"Data sheet '{sheet_id}' is empty, skipping...")
-                        continue
-                    
-                    # Store the loaded sheet
+                sheet_content = self.load_data_sheet(sheet_id)
+                if sheet_content is not None:
                     self.data_sheets[sheet_id] = sheet_content
-                    logger.info(f"Successfully loaded sheet '{sheet_id}' with {len(sheet_content)} rows and {len(sheet_content.columns)} columns")
-                    
-                except Exception as e:
-                    # Log error but continue with other sheets
-                    logger.error(f"Error loading sheet '{sheet_id}': {e}")
-                    continue
             
             # Ensure at least one sheet was loaded successfully
             if not self.data_sheets:
@@ -217,6 +502,405 @@ class DataTableProcessor:
             logger.error(f"Error reading source file: {e}")
             raise
 
+    def load_data_sheet(self, sheet_id):
+        """
+        Load a single sheet from the source file.
+        
+        Returns:
+            DataFrame or None: The sheet content, or None if it is empty or failed to load
+        """
+        try:
+            logger.info(f"Loading data sheet: '{sheet_id}'")
+            
+            # Read sheet with specific parameters to preserve data integrity
+            sheet_content = pd.read_excel(
+                self.source_file,
+                sheet_name=sheet_id,
+                header=None,  # Don't automatically detect headers
+                keep_default_na=False,  # Keep empty strings as-is
+                dtype=str  # Read everything as string to preserve formatting
+            )
+            
+            # Skip empty sheets
+            if sheet_content.empty:
+                logger.warning(f"Data sheet '{sheet_id}' is empty, skipping...")
+                return None
+            
+            logger.info(f"Successfully loaded sheet '{sheet_id}' with {len(sheet_content)} rows and {len(sheet_content.columns)} columns")
+            return sheet_content
+            
+        except Exception as e:
+            # Log error but continue with other sheets
+            logger.error(f"Error loading sheet '{sheet_id}': {e}")
+            return None
+
+    def estimate_sheet_sizes(self):
+        """
+        Estimate the in-memory size of each sheet without loading any data.
+        
+        For .xlsx files the uncompressed size of each worksheet's XML part is read
+        from the zip directory (sheet names are mapped to parts through
+        xl/workbook.xml and its relationships) and scaled by SHEET_MEMORY_FACTOR.
+        Other formats fall back to the source file size for every sheet.
+        
+        Returns:
+            dict: Sheet name -> estimated bytes
+        """
+        fallback = self.source_file.stat().st_size * SHEET_MEMORY_FACTOR
+        try:
+            with zipfile.ZipFile(self.source_file) as archive:
+                workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+                relationships = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+                targets = {rel.get('Id'): rel.get('Target') for rel in relationships.iter(f'{XLSX_PACKAGE_REL_NS}Relationship')}
+                part_sizes = {info.filename: info.file_size for info in archive.infolist()}
+                
+                sheet_sizes = {}
+                for sheet in workbook.iter(f'{XLSX_MAIN_NS}sheet'):
+                    target = targets.get(sheet.get(f'{XLSX_REL_NS}id'), '')
+                    # Targets are relative to xl/ unless they are absolute package paths
+                    part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+                    sheet_sizes[sheet.get('name')] = part_sizes.get(part, 0) * SHEET_MEMORY_FACTOR or fallback
+                return sheet_sizes
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+            logger.warning(f"Could not read worksheet sizes from '{self.source_file}' ({e}), using file size as estimate")
+            return {sheet_id: fallback for sheet_id in self.sheet_identifiers}
+
+    def worker_config(self):
+        """
+        Constructor arguments for rebuilding this processor in a worker process.
+        """
+        return {
+            "source_file": str(self.source_file),
+            "output_directory": str(self.output_directory),
+            "horizontal_key_column": self.horizontal_key_column,
+            "vertical_key_row": self.vertical_key_row,
+            "skip_columns": self.skip_columns,
+            "skip_rows": self.skip_rows,
+            "horizontal_file_prefix": self.horizontal_file_prefix,
+            "vertical_file_prefix": self.vertical_file_prefix,
+            "horizontal_data_suffix": self.horizontal_data_suffix,
+            "vertical_data_suffix": self.vertical_data_suffix,
+            "dedupe": self.dedupe
+        }
+
+    def sheet_fingerprint(self, sheet_data):
+        """
+        Fingerprint a sheet's content together with the configuration that shapes its output.
+        
+        Two sheets with the same fingerprint produce identical group files, so only
+        one of them needs processing.
+        
+        Returns:
+            str: SHA-256 hex digest
+        """
+        effective_config = {
+            "horizontal_key_column": self.horizontal_key_column,
+            "vertical_key_row": self.vertical_key_row,
+            "skip_columns": self.skip_columns,
+            "skip_rows": self.skip_rows,
+            "horizontal_file_prefix": self.horizontal_file_prefix,
+            "vertical_file_prefix": self.vertical_file_prefix,
+            "horizontal_data_suffix": self.horizontal_data_suffix,
+            "vertical_data_suffix": self.vertical_data_suffix
+        }
+        digest = hashlib.sha256(json.dumps(effective_config, sort_keys=True).encode('utf-8'))
+        digest.update(repr(sheet_data.shape).encode('utf-8'))
+        for row in sheet_data.itertuples(index=False, name=None):
+            # Unit/record separators keep cell boundaries unambiguous
+            digest.update(('\x1f'.join(map(str, row)) + '\x1e').encode('utf-8'))
+        return digest.hexdigest()
+
+    def claim_fingerprint(self, fingerprint):
+        """
+        Atomically claim a fingerprint for this run.
+        
+        The claim is a file under output/.fingerprints/ created with O_EXCL, so exactly
+        one sheet (in any process) wins it. It holds the owner's process id until
+        the owner publishes its result, so waiting duplicates can tell if it died.
+        
+        Returns:
+            bool: True if this sheet owns the fingerprint, False if another sheet claimed it first
+        """
+        try:
+            claim = os.open(self.fingerprint_dir / fingerprint, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        try:
+            os.write(claim, json.dumps({"pid": os.getpid()}).encode('utf-8'))
+        finally:
+            os.close(claim)
+        return True
+
+    def record_fingerprint_result(self, fingerprint, sheet_identifier, success, seconds):
+        """
+        Publish the owner's result in its claim file (atomically, so waiting duplicates never read a partial file).
+        """
+        claim_file = self.fingerprint_dir / fingerprint
+        temp_file = claim_file.with_name(f"{fingerprint}.{os.getpid()}.tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"sheet": sheet_identifier, "success": success, "seconds": seconds}, f)
+        os.replace(temp_file, claim_file)
+
+    def wait_for_fingerprint_result(self, fingerprint, poll_interval=0.05):
+        """
+        Wait until the owner of a fingerprint has published its result.
+        
+        Gives up if the owner's process is gone, if the claim never received its
+        owner's process id, or after FINGERPRINT_WAIT_TIMEOUT seconds.
+        
+        Returns:
+            dict or None: {"sheet": owner sheet, "success": bool, "seconds": processing time},
+                          or None if the duplicate should process the sheet itself
+        """
+        claim_file = self.fingerprint_dir / fingerprint
+        started = time.monotonic()
+        while True:
+            waited = time.monotonic() - started
+            try:
+                with open(claim_file, 'r', encoding='utf-8') as f:
+                    claim = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                # Claim created but the owner's process id not written yet
+                claim = {}
+            
+            if "success" in claim:
+                return claim
+            if "pid" in claim and not process_alive(claim["pid"]):
+                logger.warning(f"Owner of fingerprint {fingerprint[:12]} (pid {claim['pid']}) exited without a result")
+                return None
+            if ("pid" not in claim and waited > FINGERPRINT_CLAIM_GRACE) or waited > FINGERPRINT_WAIT_TIMEOUT:
+                logger.warning(f"Gave up waiting for the owner of fingerprint {fingerprint[:12]} after {waited:.0f}s")
+                return None
+            time.sleep(poll_interval)
+
+    def materialize_duplicate(self, sheet_identifier, original_identifier):
+        """
+        Provide the output of a duplicate sheet from the sheet it duplicates.
+        
+        In "link" mode every group file of the original is hardlinked into the
+        duplicate's directories, falling back to a copy where hardlinks aren't
+        supported. In "manifest" mode nothing is written.
+        
+        Returns:
+            tuple: (files, bytes_saved)
+        """
+        files = 0
+        bytes_saved = 0
+        for output_dir in (self.horizontal_output_dir, self.vertical_output_dir):
+            source_subdir = output_dir / self.sanitize_identifier(original_identifier)
+            target_subdir = output_dir / self.sanitize_identifier(sheet_identifier)
+            if not source_subdir.is_dir():
+                continue
+            if self.dedupe == "link":
+                os.makedirs(target_subdir, exist_ok=True)
+            for source_file in sorted(source_subdir.glob("*.json")):
+                files += 1
+                if self.dedupe == "manifest":
+                    bytes_saved += source_file.stat().st_size
+                    continue
+                # Sheets whose names sanitize identically already share a directory
+                if target_subdir == source_subdir:
+                    continue
+                if link_or_copy(source_file, target_subdir / source_file.name):
+                    bytes_saved += source_file.stat().st_size
+        return files, bytes_saved
+
+    def process_sheet(self, sheet_identifier, sheet_data):
+        """
+        Process a sheet unless an identical sheet (same content and configuration)
+        was already processed in this run, in which case its output is reused.
+        
+        Returns:
+            tuple: (success, duplicate_record) where duplicate_record is None for
+                   processed sheets and describes the saved work for duplicates
+        """
+        if self.dedupe == "off":
+            return self.process_data_sheet(sheet_identifier, sheet_data), None
+        
+        fingerprint = self.sheet_fingerprint(sheet_data)
+        if self.claim_fingerprint(fingerprint):
+            started = time.perf_counter()
+            success = False
+            try:
+                success = self.process_data_sheet(sheet_identifier, sheet_data)
+            finally:
+                # Always publish a result so duplicates never wait on a failed owner
+                self.record_fingerprint_result(fingerprint, sheet_identifier, success, time.perf_counter() - started)
+            return success, None
+        
+        original = self.wait_for_fingerprint_result(fingerprint)
+        if original is None:
+            return self.process_data_sheet(sheet_identifier, sheet_data), None
+        logger.info(f"Sheet '{sheet_identifier}' duplicates sheet '{original['sheet']}', reusing its output")
+        if not original["success"]:
+            return False, None
+        files, bytes_saved = self.materialize_duplicate(sheet_identifier, original["sheet"])
+        return True, {
+            "sheet": sheet_identifier,
+            "duplicate_of": original["sheet"],
+            "fingerprint": fingerprint,
+            "cells_skipped": int(sheet_data.size),
+            "files": files,
+            "bytes_saved": bytes_saved,
+            "seconds_saved": round(original["seconds"], 3)
+        }
+
+    def total_bytes_saved(self, duplicate_records):
+        """
+        Bytes saved by deduplication, counted once per duplicate output directory:
+        duplicates whose names sanitize alike share (and overwrite) one directory.
+        """
+        saved_by_subdir = {}
+        for record in duplicate_records:
+            saved_by_subdir.setdefault(self.sanitize_identifier(record["sheet"]), record["bytes_saved"])
+        return sum(saved_by_subdir.values())
+
+    def reset_fingerprints(self, create=True):
+        """Drop all fingerprint claims; claims only live for the duration of one run."""
+        shutil.rmtree(self.fingerprint_dir, ignore_errors=True)
+        if create:
+            os.makedirs(self.fingerprint_dir, exist_ok=True)
+
+    def process_sheets_within_budget(self):
+        """
+        Process all sheets one at a time per worker, keeping the estimated memory
+        of sheets in flight within max_memory.
+        
+        Sheets are admitted in workbook order: the next sheet is submitted while
+        a worker is free and its estimate fits the remaining budget, otherwise
+        the loop waits for a running sheet to finish. A sheet larger than the
+        whole budget runs on its own.
+        
+        Returns:
+            tuple: (successful_sheets, failed_sheets, duplicate_records)
+        """
+        sheet_sizes = self.estimate_sheet_sizes()
+        max_workers = self.max_workers or os.cpu_count() or 1
+        config = self.worker_config()
+        logger.info(f"Memory budget mode: {self.max_memory} bytes across up to {max_workers} workers")
+        
+        successful_sheets = 0
+        failed_sheets = 0
+        loaded_sheets = 0
+        duplicate_records = []
+        pending = list(self.sheet_identifiers)
+        in_flight = {}  # future -> estimated bytes
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            while pending or in_flight:
+                # Admit as many sheets as fit the budget and the worker count
+                while pending and len(in_flight) < max_workers:
+                    estimate = sheet_sizes.get(pending[0], 0)
+                    if in_flight and sum(in_flight.values()) + estimate > self.max_memory:
+                        break
+                    sheet_identifier = pending.pop(0)
+                    logger.info(f"Admitting sheet '{sheet_identifier}' (estimated {estimate} bytes)")
+                    in_flight[executor.submit(process_sheet_worker, config, sheet_identifier)] = estimate
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    try:
+                        sheet_identifier, status, duplicate_record = future.result()
+                    except Exception as e:
+                        logger.error(f"Worker failed: {e}")
+                        failed_sheets += 1
+                        continue
+                    if status == "skipped":
+                        continue
+                    loaded_sheets += 1
+                    if duplicate_record:
+                        duplicate_records.append(duplicate_record)
+                    if status == "processed":
+                        successful_sheets += 1
+                    else:
+                        failed_sheets += 1
+        
+        # Same contract as load_data_sheets
+        if not loaded_sheets and not failed_sheets:
+            raise ValueError("No valid data sheets could be loaded from the source file")
+        return successful_sheets, failed_sheets, duplicate_records
+
+    def render_group_pdfs(self, duplicate_records=None):
+        """
+        Render all horizontal and vertical group files as PDF documents.
+        
+        Documents are rendered on a process pool; each worker keeps one cached
+        renderer. PDFs mirror the JSON layout under pdf_groups/, e.g.
+        horizontal_groups/sheet/H_key.json -> pdf_groups/horizontal_groups/sheet/H_key.pdf
+        
+        Duplicate sheets aren't rendered again. In "link" mode their PDFs are
+        linked from the sheet they duplicate, like their group files; in
+        "manifest" mode they get no files, only a reference in the statistics.
+        
+        Args:
+            duplicate_records: Duplicate sheet records from deduplication
+        
+        Returns:
+            dict: Rendering statistics (documents, pages, failures, pages per second)
+        """
+        duplicate_subdirs = {}
+        for record in duplicate_records or []:
+            duplicate_subdir = self.sanitize_identifier(record["sheet"])
+            original_subdir = self.sanitize_identifier(record["duplicate_of"])
+            if duplicate_subdir != original_subdir:
+                duplicate_subdirs[duplicate_subdir] = original_subdir
+        
+        group_files = []
+        for output_dir in (self.horizontal_output_dir, self.vertical_output_dir):
+            group_files += [
+                json_file for json_file in sorted(output_dir.rglob("*.json"))
+                if json_file.relative_to(output_dir).parts[0] not in duplicate_subdirs
+            ]
+        logger.info(f"Rendering {len(group_files)} group files to PDF")
+        
+        documents = 0
+        pages = 0
+        failed = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.pdf_workers) as executor:
+            futures = {}
+            for json_file in group_files:
+                pdf_file = self.pdf_output_dir / json_file.relative_to(self.output_directory).with_suffix(".pdf")
+                futures[executor.submit(render_group_pdf, str(json_file), str(pdf_file), self.pdf_font)] = json_file
+            
+            for future in as_completed(futures):
+                try:
+                    pages += future.result()
+                    documents += 1
+                except Exception as e:
+                    logger.error(f"Error rendering PDF for '{futures[future]}': {e}")
+                    failed += 1
+        elapsed = time.perf_counter() - started
+        
+        reused = 0
+        references = []
+        for duplicate_subdir, original_subdir in duplicate_subdirs.items():
+            if self.dedupe != "link":
+                references.append({"duplicate": duplicate_subdir, "duplicate_of": original_subdir})
+                continue
+            for output_dir in (self.horizontal_output_dir, self.vertical_output_dir):
+                pdf_dir = self.pdf_output_dir / output_dir.relative_to(self.output_directory)
+                if not (pdf_dir / original_subdir).is_dir():
+                    continue
+                os.makedirs(pdf_dir / duplicate_subdir, exist_ok=True)
+                for source_file in sorted((pdf_dir / original_subdir).glob("*.pdf")):
+                    link_or_copy(source_file, pdf_dir / duplicate_subdir / source_file.name)
+                    reused += 1
+        
+        pages_per_second = round(pages / elapsed, 2) if elapsed > 0 else None
+        logger.info(f"Rendered {documents} PDF documents ({pages} pages) in {elapsed:.2f}s - {pages_per_second} pages/s, reused {reused}")
+        return {
+            "directory": str(self.pdf_output_dir),
+            "documents": documents,
+            "failed_documents": failed,
+            "reused_documents": reused,
+            "duplicate_references": references,
+            "pages": pages,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": pages_per_second
+        }
+
     def process_horizontal_grouping(self, sheet_identifier, sheet_data, output_subdir):
         """
         Process data sheet for horizontal grouping (group rows by key column values).
@@ -254,102 +938,10 @@ class DataTableProcessor:
         Returns:
             bool: True if processing was successful, False otherwise
         """
-        try:
-            logger.info(f"Processing sheet: '{sheet_identifier}' (HORIZONTAL grouping)")
-            
-            # Determine which column to use for grouping
-            grouping_column = self.horizontal_key_column
-            if grouping_column is None:
-                # Auto-select first non-skipped column if not specified
-                if len(sheet_data.columns) <= self.skip_columns:
-                    logger.warning(f"Sheet '{sheet_identifier}' has insufficient columns for horizontal grouping, skipping...")
-                    return False
-                grouping_column = self.skip_columns
-                logger.info(f"Auto-selected grouping column for sheet '{sheet_identifier}': column {grouping_column}")
-            elif isinstance(grouping_column, str):
-                # Convert column name to index if string was provided
-                try:
-                    grouping_column = list(sheet_data.columns).index(grouping_column)
-                except ValueError:
-                    logger.error(f"Grouping column '{self.horizontal_key_column}' not found in sheet '{sheet_identifier}'")
-                    return False
-
-            # Extract all unique values from the grouping column
-            # CORE FUNCTIONALITY: Skip NaN and empty values automatically
-            unique_group_keys = set()
-            for row_index in range(self.skip_rows, len(sheet_data)):
-                if grouping_column < len(sheet_data.columns):
-                    key_value = str(sheet_data.iloc[row_index, grouping_column]).strip()
-                    # Filter out empty or NaN values - this is essential for clean grouping
-                    if key_value and key_value.lower() != 'nan':
-                        unique_group_keys.add(key_value)
-            
-            logger.info(f"Sheet '{sheet_identifier}' - Found {len(unique_group_keys)} unique horizontal keys: {list(unique_group_keys)}")
-            
-            # Process each unique group key to create separate JSON files
-            for group_key in unique_group_keys:
-                group_data = []
-                # Apply suffix to group key if configured
-                formatted_group_key = f"{group_key}{self.horizontal_data_suffix}".upper() if self.horizontal_data_suffix else group_key.upper()
-                element_data = {}  # Dictionary to store all data for this group
-                
-                # Extract all rows that belong to this group
-                for row_index in range(self.skip_rows, len(sheet_data)):
-                    if grouping_column >= len(sheet_data.columns):
-                        continue
-                        
-                    # Check if this row belongs to the current group
-                    current_key = str(sheet_data.iloc[row_index, grouping_column]).strip()
-                    if current_key != group_key:
-                        continue
-                        
-                    # Process each column in the row (except skipped and grouping columns)
-                    for col_index in range(len(sheet_data.columns)):
-                        if col_index < self.skip_columns or col_index == grouping_column:
-                            continue
-                        
-                        # Use the first row as column headers
-                        # This assumes the first row contains column names
-                        header_row_index = 0  # Use first row as header
-                        element_name = str(sheet_data.iloc[header_row_index, col_index]).strip()
-                        if not element_name or element_name.lower() == 'nan':
-                            # Fallback to generic column name if header is empty
-                            element_name = f"Column_{col_index}"
-                        
-                        # Get the cell value
-                        cell_content = str(sheet_data.iloc[row_index, col_index]).strip()
-                        if not cell_content or cell_content.lower() == 'nan':
-                            continue
-                        
-                        # Split multi-line content into separate array elements
-                        content_lines = [line.strip() for line in str(cell_content).split('\n') if line.strip()]
-                        
-                        # Initialize array for this element if not exists
-                        if element_name not in element_data:
-                            element_data[element_name] = []
-                        
-                        # Add content lines to the element's array
-                        element_data[element_name].extend(content_lines)
-                
-                # Create the final JSON structure with the group key as top-level key
-                if element_data:
-                    group_data = {formatted_group_key: element_data}
-                
-                # Save the group data to a JSON file
-                if group_data:
-                    # Sanitize filename to be filesystem-safe
-                    safe_filename = self.sanitize_identifier(group_key)
-                    # Apply horizontal prefix to filename
-                    output_file = output_subdir / f"{self.horizontal_file_prefix}{safe_filename}.json"
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(group_data, f, indent=2, ensure_ascii=False)
-                    logger.info(f"Saved horizontal group: {output_file}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error processing sheet '{sheet_identifier}' in horizontal mode: {e}")
-            return False
+        horizontal_success, _ = self.process_dual_grouping(
+            sheet_identifier, sheet_data, horizontal_subdir=output_subdir, vertical_subdir=None
+        )
+        return horizontal_success
 
     def process_vertical_grouping(self, sheet_identifier, sheet_data, output_subdir):
         """
@@ -388,100 +980,240 @@ class DataTableProcessor:
         Returns:
             bool: True if processing was successful, False otherwise
         """
+        _, vertical_success = self.process_dual_grouping(
+            sheet_identifier, sheet_data, horizontal_subdir=None, vertical_subdir=output_subdir
+        )
+        return vertical_success
+
+    def resolve_grouping_column(self, sheet_identifier, sheet_data):
+        """
+        Resolve the horizontal KEY COLUMN to a column index.
+        
+        Returns:
+            int or None: Column index, or None if horizontal grouping can't run on this sheet
+        """
+        grouping_column = self.horizontal_key_column
+        if grouping_column is None:
+            # Auto-select first non-skipped column if not specified
+            if len(sheet_data.columns) <= self.skip_columns:
+                logger.warning(f"Sheet '{sheet_identifier}' has insufficient columns for horizontal grouping, skipping...")
+                return None
+            grouping_column = self.skip_columns
+            logger.info(f"Auto-selected grouping column for sheet '{sheet_identifier}': column {grouping_column}")
+        elif isinstance(grouping_column, str):
+            # Convert column name to index if string was provided
+            try:
+                grouping_column = list(sheet_data.columns).index(grouping_column)
+            except ValueError:
+                logger.error(f"Grouping column '{self.horizontal_key_column}' not found in sheet '{sheet_identifier}'")
+                return None
+        return grouping_column
+
+    def resolve_grouping_row(self, sheet_identifier, sheet_data):
+        """
+        Resolve the vertical KEY ROW to a row index.
+        
+        Returns:
+            int or None: Row index, or None if vertical grouping can't run on this sheet
+        """
+        grouping_row = self.vertical_key_row
+        if grouping_row is None:
+            # Auto-select first non-skipped row if not specified
+            grouping_row = self.skip_rows
+            logger.info(f"Auto-selected grouping row for sheet '{sheet_identifier}': row {grouping_row}")
+
+        # Validate the grouping row exists
+        if grouping_row >= len(sheet_data):
+            logger.warning(f"Grouping row {grouping_row} is beyond data range for vertical grouping, skipping...")
+            return None
+        return grouping_row
+
+    def resolve_label_column(self, sheet_data):
+        """
+        Resolve the column that holds row labels for vertical grouping.
+        Uses the configured horizontal key column, or the first non-skipped column.
+        """
+        parameter_column = self.horizontal_key_column if self.horizontal_key_column is not None else self.skip_columns
+        if isinstance(parameter_column, str):
+            try:
+                parameter_column = list(sheet_data.columns).index(parameter_column)
+            except ValueError:
+                parameter_column = self.skip_columns
+        return parameter_column
+
+    def process_dual_grouping(self, sheet_identifier, sheet_data, horizontal_subdir=None, vertical_subdir=None):
+        """
+        Process a data sheet for horizontal and/or vertical grouping in ONE pass.
+        
+        SINGLE-TRAVERSAL ENGINE:
+        1. Takes the sheet's underlying NumPy matrix once (no per-cell iloc lookups)
+        2. Resolves column headers, row labels and both key lines once
+        3. Walks the matrix row by row a single time; every non-empty cell is
+           split into lines once and appended to the horizontal accumulator of its
+           row key and/or the vertical accumulator of its column key
+        4. Writes one JSON file per group for each requested mode
+        
+        A mode is only run if its output directory is given. The output is identical
+        to running process_horizontal_grouping and process_vertical_grouping separately:
+        - horizontal groups fill in row-major order, as the row-by-row scan does
+        - vertical groups are bucketed per column and emitted column by column,
+          reproducing the column-major order of the vertical scan
+        
+        Args:
+            sheet_identifier: Name of the sheet being processed
+            sheet_data: DataFrame containing the sheet data
+            horizontal_subdir: Output directory for horizontal groups (None to skip the mode)
+            vertical_subdir: Output directory for vertical groups (None to skip the mode)
+            
+        Returns:
+            tuple: (horizontal_success, vertical_success); a skipped mode reports False
+        """
+        run_horizontal = horizontal_subdir is not None
+        run_vertical = vertical_subdir is not None
+        modes = " + ".join(name for name, run in (("HORIZONTAL", run_horizontal), ("VERTICAL", run_vertical)) if run)
+        
         try:
-            logger.info(f"Processing sheet: '{sheet_identifier}' (VERTICAL grouping)")
-            
-            # Determine which row to use for grouping
-            grouping_row = self.vertical_key_row
-            if grouping_row is None:
-                # Auto-select first non-skipped row if not specified
-                grouping_row = self.skip_rows
-                logger.info(f"Auto-selected grouping row for sheet '{sheet_identifier}': row {grouping_row}")
-
-            # Validate the grouping row exists
-            if grouping_row >= len(sheet_data):
-                logger.warning(f"Grouping row {grouping_row} is beyond data range for vertical grouping, skipping...")
-                return False
-
-            # Extract all unique values from the grouping row
-            # CORE FUNCTIONALITY: Skip NaN and empty values automatically
-            unique_group_keys = set()
-            for col_index in range(self.skip_columns, len(sheet_data.columns)):
-                key_value = str(sheet_data.iloc[grouping_row, col_index]).strip()
-                # Filter out empty or NaN values - this is essential for clean grouping
-                if key_value and key_value.lower() != 'nan':
-                    unique_group_keys.add(key_value)
-            
-            logger.info(f"Sheet '{sheet_identifier}' - Found {len(unique_group_keys)} unique vertical keys: {list(unique_group_keys)}")
-            
-            # Process each unique group key to create separate JSON files
-            for group_key in unique_group_keys:
-                group_data = []
-                # Apply suffix to group key if configured
-                formatted_group_key = f"{group_key}{self.vertical_data_suffix}".upper() if self.vertical_data_suffix else group_key.upper()
-                element_data = {}  # Dictionary to store all data for this group
+            logger.info(f"Processing sheet: '{sheet_identifier}' ({modes} grouping)")
+            
+            matrix = sheet_data.to_numpy(dtype=object)
+            row_count, column_count = matrix.shape
+            
+            # Resolve the key column (horizontal) and key row (vertical) once
+            grouping_column = self.resolve_grouping_column(sheet_identifier, sheet_data) if run_horizontal else None
+            grouping_row = self.resolve_grouping_row(sheet_identifier, sheet_data) if run_vertical else None
+            horizontal_active = grouping_column is not None
+            vertical_active = grouping_row is not None
+            
+            # Horizontal: key of every data row, and column headers from the first row
+            row_keys = [None] * row_count
+            headers = [None] * column_count
+            if horizontal_active and grouping_column < column_count:
+                for row_index in range(self.skip_rows, row_count):
+                    key_value = str(matrix[row_index, grouping_column]).strip()
+                    # Filter out empty or NaN values - this is essential for clean grouping
+                    if key_value and key_value.lower() != 'nan':
+                        row_keys[row_index] = key_value
+                for col_index in range(column_count):
+                    element_name = str(matrix[0, col_index]).strip()
+                    if not element_name or element_name.lower() == 'nan':
+                        # Fallback to generic column name if header is empty
+                        element_name = f"Column_{col_index}"
+                    headers[col_index] = element_name
+            
+            # Vertical: key of every data column, and row labels from the label column
+            column_keys = [None] * column_count
+            row_labels = [None] * row_count
+            label_rows = []
+            if vertical_active:
+                for col_index in range(self.skip_columns, column_count):
+                    key_value = str(matrix[grouping_row, col_index]).strip()
+                    if key_value and key_value.lower() != 'nan':
+                        column_keys[col_index] = key_value
+                label_rows = [row_index for row_index in range(self.skip_rows, row_count) if row_index != grouping_row]
                 
-                # Extract all columns that belong to this group
-                for col_index in range(self.skip_columns, len(sheet_data.columns)):
-                    # Check if this column belongs to the current group
-                    current_key = str(sheet_data.iloc[grouping_row, col_index]).strip()
-                    if current_key != group_key:
-                        continue
-                        
-                    # Process each row in the column (except skipped and grouping rows)
-                    for row_index in range(len(sheet_data)):
-                        if row_index < self.skip_rows or row_index == grouping_row:
-                            continue
-                        
-                        # Determine which column contains row labels/names
-                        # This allows using either the configured column or auto-detecting
-                        parameter_column = self.horizontal_key_column if self.horizontal_key_column is not None else self.skip_columns
-                        if isinstance(parameter_column, str):
-                            try:
-                                parameter_column = list(sheet_data.columns).index(parameter_column)
-                            except ValueError:
-                                parameter_column = self.skip_columns
-                        
-                        # Get the row label from the parameter column
-                        element_name = str(sheet_data.iloc[row_index, parameter_column]).strip()
+                # Labels are only needed (and the label column only checked) if there is something to group
+                label_column = self.resolve_label_column(sheet_data) if any(column_keys) and label_rows else None
+                if label_column is not None and not -column_count <= label_column < column_count:
+                    logger.error(f"Error processing sheet '{sheet_identifier}' in vertical mode: "
+                                 f"label column {label_column} is out of range")
+                    vertical_active = False
+                elif label_column is not None:
+                    for row_index in label_rows:
+                        element_name = str(matrix[row_index, label_column]).strip()
                         if not element_name or element_name.lower() == 'nan':
                             # Fallback to generic row name if label is empty
                             element_name = f"Row_{row_index}"
-                        
-                        # Get the cell value
-                        cell_content = str(sheet_data.iloc[row_index, col_index]).strip()
-                        if not cell_content or cell_content.lower() == 'nan':
-                            continue
-                        
-                        # Split multi-line content into separate array elements
-                        content_lines = [line.strip() for line in str(cell_content).split('\n') if line.strip()]
-                        
-                        # Initialize array for this element if not exists
-                        if element_name not in element_data:
-                            element_data[element_name] = []
-                        
-                        # Add content lines to the element's array
-                        element_data[element_name].extend(content_lines)
+                        row_labels[row_index] = element_name
+            
+            horizontal_keys = {key for key in row_keys if key is not None}
+            vertical_keys = {key for key in column_keys if key is not None} if vertical_active else set()
+            if horizontal_active:
+                logger.info(f"Sheet '{sheet_identifier}' - Found {len(horizontal_keys)} unique horizontal keys: {list(horizontal_keys)}")
+            if vertical_active:
+                logger.info(f"Sheet '{sheet_identifier}' - Found {len(vertical_keys)} unique vertical keys: {list(vertical_keys)}")
+            
+            # Accumulators
+            horizontal_groups = {key: {} for key in horizontal_keys}  # group -> {header: [lines]}
+            vertical_buckets = {key: {} for key in vertical_keys}     # group -> {column: [(label, lines)]}
+            vertical_row_flags = [False] * row_count
+            for row_index in label_rows:
+                vertical_row_flags[row_index] = vertical_active
+            
+            # SINGLE TRAVERSAL of the matrix
+            for row_index in range(row_count):
+                row_key = row_keys[row_index]
+                vertical_row = vertical_row_flags[row_index]
+                if row_key is None and not vertical_row:
+                    continue
                 
-                # Create the final JSON structure with the group key as top-level key
-                if element_data:
-                    group_data = {formatted_group_key: element_data}
+                row = matrix[row_index]
+                element_data = horizontal_groups[row_key] if row_key is not None else None
+                row_label = row_labels[row_index]
                 
-                # Save the group data to a JSON file
-                if group_data:
-                    # Sanitize filename to be filesystem-safe
-                    safe_filename = self.sanitize_identifier(group_key)
-                    # Apply vertical prefix to filename
-                    output_file = output_subdir / f"{self.vertical_file_prefix}{safe_filename}.json"
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(group_data, f, indent=2, ensure_ascii=False)
-                    logger.info(f"Saved vertical group: {output_file}")
-            
-            return True
+                for col_index in range(self.skip_columns, column_count):
+                    column_key = column_keys[col_index] if vertical_row else None
+                    in_horizontal = element_data is not None and col_index != grouping_column
+                    if not in_horizontal and column_key is None:
+                        continue
+                    
+                    # Get the cell value
+                    cell_content = str(row[col_index]).strip()
+                    if not cell_content or cell_content.lower() == 'nan':
+                        continue
+                    
+                    # Split multi-line content into separate array elements (once for both modes)
+                    content_lines = [line.strip() for line in cell_content.split('\n') if line.strip()]
+                    
+                    if in_horizontal:
+                        element_data.setdefault(headers[col_index], []).extend(content_lines)
+                    if column_key is not None:
+                        vertical_buckets[column_key].setdefault(col_index, []).append((row_label, content_lines))
+            
+            # Save horizontal groups
+            for group_key, element_data in horizontal_groups.items():
+                self.save_group_file(horizontal_subdir, self.horizontal_file_prefix, self.horizontal_data_suffix,
+                                     group_key, element_data, "horizontal")
+            
+            # Save vertical groups, assembling each column in order
+            for group_key, columns in vertical_buckets.items():
+                element_data = {}
+                for col_index in sorted(columns):
+                    for element_name, content_lines in columns[col_index]:
+                        element_data.setdefault(element_name, []).extend(content_lines)
+                self.save_group_file(vertical_subdir, self.vertical_file_prefix, self.vertical_data_suffix,
+                                     group_key, element_data, "vertical")
+            
+            return horizontal_active, vertical_active
             
         except Exception as e:
-            logger.error(f"Error processing sheet '{sheet_identifier}' in vertical mode: {e}")
-            return False
+            if run_horizontal and run_vertical:
+                # Don't let one mode's failure fail the other: redo each mode on its own
+                logger.warning(f"Error processing sheet '{sheet_identifier}' in combined mode ({e}), "
+                               f"processing each mode separately")
+                horizontal_success, _ = self.process_dual_grouping(sheet_identifier, sheet_data, horizontal_subdir, None)
+                _, vertical_success = self.process_dual_grouping(sheet_identifier, sheet_data, None, vertical_subdir)
+                return horizontal_success, vertical_success
+            logger.error(f"Error processing sheet '{sheet_identifier}' in {modes.lower()} mode: {e}")
+            return False, False
+
+    def save_group_file(self, output_subdir, file_prefix, data_suffix, group_key, element_data, mode):
+        """
+        Save one group as {"GROUP_KEY[suffix]": element_data} to <prefix><sanitized key>.json.
+        Groups without any data are not written.
+        """
+        if not element_data:
+            return
+        
+        # Apply suffix to group key if configured
+        formatted_group_key = f"{group_key}{data_suffix}".upper() if data_suffix else group_key.upper()
+        group_data = {formatted_group_key: element_data}
+        
+        # Sanitize filename to be filesystem-safe and apply the mode prefix
+        safe_filename = self.sanitize_identifier(group_key)
+        output_file = output_subdir / f"{file_prefix}{safe_filename}.json"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(group_data, f, indent=2, ensure_ascii=False)
+        logger.info(f"Saved {mode} group: {output_file}")
 
     def process_data_sheet(self, sheet_identifier, sheet_data):
         """
@@ -515,10 +1247,11 @@ class DataTableProcessor:
             os.makedirs(horizontal_subdir, exist_ok=True)
             os.makedirs(vertical_subdir, exist_ok=True)
             
-            # Process both grouping methods independently
-            # This allows partial success if one mode fails
-            horizontal_success = self.process_horizontal_grouping(sheet_identifier, sheet_data, horizontal_subdir)
-            vertical_success = self.process_vertical_grouping(sheet_identifier, sheet_data, vertical_subdir)
+            # Fill both grouping modes from a single traversal of the sheet
+            # Each mode still reports its own success, allowing partial success
+            horizontal_success, vertical_success = self.process_dual_grouping(
+                sheet_identifier, sheet_data, horizontal_subdir, vertical_subdir
+            )
             
             # Return True if at least one mode succeeded
             return horizontal_success or vertical_success
@@ -553,6 +1286,10 @@ class DataTableProcessor:
         2. Process each sheet in both horizontal and vertical modes
         3. Generate a summary report of the processing results
         
+        With max_memory set, steps 1 and 2 instead run sheet by sheet on a worker
+        pool (see process_sheets_within_budget), so peak memory follows the budget
+        rather than the sum of all sheets.
+        
         The method continues processing even if individual sheets fail,
         ensuring maximum data extraction from partially corrupted files.
         
@@ -560,22 +1297,40 @@ class DataTableProcessor:
             bool: True if at least one sheet was processed successfully, False otherwise
         """
         try:
-            # Step 1: Load all data sheets from the source file
-            self.load_data_sheets()
+            if self.dedupe != "off":
+                self.reset_fingerprints()
             
-            # Initialize counters for summary statistics
-            successful_sheets = 0
-            failed_sheets = 0
+            if self.max_memory:
+                # Memory budget mode: each sheet is loaded, processed and released in a worker
+                self.discover_sheets()
+                successful_sheets, failed_sheets, duplicate_records = self.process_sheets_within_budget()
+            else:
+                # Step 1: Load all data sheets from the source file
+                self.load_data_sheets()
+                
+                # Initialize counters for summary statistics
+                successful_sheets = 0
+                failed_sheets = 0
+                duplicate_records = []
+                
+                # Step 2: Process each loaded sheet (duplicates reuse earlier output)
+                for sheet_identifier, sheet_data in self.data_sheets.items():
+                    success, duplicate_record = self.process_sheet(sheet_identifier, sheet_data)
+                    if duplicate_record:
+                        duplicate_records.append(duplicate_record)
+                    if success:
+                        successful_sheets += 1
+                    else:
+                        failed_sheets += 1
             
-            # Step 2: Process each loaded sheet
-            for sheet_identifier, sheet_data in self.data_sheets.items():
-                if self.process_data_sheet(sheet_identifier, sheet_data):
-                    successful_sheets += 1
-                else:
-                    failed_sheets += 1
+            if self.dedupe != "off":
+                self.reset_fingerprints(create=False)
             
             logger.info(f"Processing completed: {successful_sheets} sheets successful, {failed_sheets} sheets failed")
             
+            # Optional PDF stage over the written group files
+            pdf_rendering = self.render_group_pdfs(duplicate_records) if self.render_pdf else None
+            
             # Step 3: Create a comprehensive processing summary
             # This helps users understand what was processed and how
             processing_summary = {
@@ -595,6 +1350,21 @@ class DataTableProcessor:
                     "horizontal_data_suffix": self.horizontal_data_suffix,
                     "vertical_data_suffix": self.vertical_data_suffix
                 },
+                "memory": {
+                    "mode": "process-and-release" if self.max_memory else "in-memory",
+                    "max_memory_bytes": self.max_memory,
+                    "max_workers": (self.max_workers or os.cpu_count()) if self.max_memory else None,
+                    "peak_rss_bytes": peak_rss_bytes()
+                },
+                "deduplication": {
+                    "mode": self.dedupe,
+                    "duplicate_sheets": len(duplicate_records),
+                    "cells_skipped": sum(record["cells_skipped"] for record in duplicate_records),
+                    "seconds_saved": round(sum(record["seconds_saved"] for record in duplicate_records), 3),
+                    "bytes_saved": self.total_bytes_saved(duplicate_records),
+                    "duplicates": duplicate_records
+                },
+                "pdf_rendering": pdf_rendering,
                 "output_structure": {
                     "main_directory": str(self.output_directory),
                     "horizontal_groups": str(self.horizontal_output_dir),
@@ -648,6 +1418,22 @@ def main():
        - Skips first 2 rows (won't appear in any output)
        - Auto-detects key column/row after skipped ones
     
+    5. MEMORY BUDGET (process-and-release):
+       python script.py -s big.xlsx --max-memory 2G -w 4
+       - Loads, processes and releases one sheet at a time per worker
+       - Runs only as many sheets at once as fit in 2 GB (estimated)
+    
+    6. PDF RENDERING (requires fpdf2):
+       python script.py -s data.xlsx --render-pdf --pdf-workers 4
+       - Also renders every group JSON file as a paginated PDF table
+       - PDFs are written to <output>/pdf_groups/
+    
+    7. DUPLICATE SHEETS:
+       python script.py -s regions.xlsx -d manifest
+       - Sheets with identical content are processed once
+       - Default "link" hardlinks the output for copies; "manifest" only
+         records them in processing_summary.json; "off" reprocesses them
+    
     Note: NaN and empty values in key columns/rows are automatically skipped
     """
     # Set up command-line argument parser
@@ -683,6 +1469,24 @@ def main():
     # Output configuration
     parser.add_argument('-o', '--output', default='processed_data', 
                        help="Output directory for processed files (default: 'processed_data')")
+    
+    # Memory configuration
+    parser.add_argument('-m', '--max-memory', type=parse_memory_size,
+                       help="Memory budget, e.g. 512M or 2G; processes sheets one at a time per worker within it")
+    parser.add_argument('-w', '--workers', type=int,
+                       help="Maximum worker processes with --max-memory (default: CPU count)")
+    
+    # Duplicate sheet handling
+    parser.add_argument('-d', '--dedupe', choices=DEDUPE_MODES, default='link',
+                       help="Output for sheets identical to an earlier sheet: hardlinks, summary manifest, or reprocess (default: link)")
+    
+    # PDF rendering configuration
+    parser.add_argument('-p', '--render-pdf', action='store_true',
+                       help="Render each group as a PDF table document (requires fpdf2)")
+    parser.add_argument('--pdf-workers', type=int,
+                       help="Worker processes for PDF rendering (default: CPU count)")
+    parser.add_argument('--pdf-font',
+                       help="TTF font file for PDF text outside Latin-1 (default: built-in Helvetica)")
 
     args = parser.parse_args()
 
@@ -704,7 +1508,13 @@ def main():
             horizontal_file_prefix=args.horizontal_prefix,
             vertical_file_prefix=args.vertical_prefix,
             horizontal_data_suffix=args.horizontal_suffix,
-            vertical_data_suffix=args.vertical_suffix
+            vertical_data_suffix=args.vertical_suffix,
+            max_memory=args.max_memory,
+            max_workers=args.workers,
+            render_pdf=args.render_pdf,
+            pdf_workers=args.pdf_workers,
+            pdf_font=args.pdf_font,
+            dedupe=args.dedupe
         )
 
         # Execute the processing workflow
@@ -2,13 +2,512 @@ import pandas as pd
 import argparse
 import logging
 import json
+import hashlib
+import io
 import os
+import tarfile
+import time
+import zipfile
+from collections import Counter
 from pathlib import Path
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Supported output formats for grouped data
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+OUTPUT_FORMATS = ["json"] + list(COLUMNAR_FORMATS)
+
+# Supported archive formats for JSON output (format -> file extension)
+ARCHIVE_FORMATS = {"zip": ".zip", "tar.gz": ".tar.gz", "tar.zst": ".tar.zst"}
+
+
+def open_zstd(fileobj, mode):
+    """Wrap a binary file in a zstandard stream (zstandard is only needed for tar.zst)"""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("tar.zst archives require zstandard (pip install zstandard)") from e
+
+    if mode == "w":
+        return zstandard.ZstdCompressor().stream_writer(fileobj)
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+class GroupArchiveWriter:
+    """
+    Streams group JSON documents straight into a compressed archive as they are produced,
+    so no loose files are written and no second packing pass is needed.
+    """
+
+    def __init__(self, archive_file, archive_format="zip"):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+
+        self.archive_file = Path(archive_file)
+        self.archive_format = archive_format
+        self.member_count = 0
+        self.zstd_stream = None
+
+        if archive_format == "zip":
+            self.archive = zipfile.ZipFile(self.archive_file, 'w', compression=zipfile.ZIP_DEFLATED)
+        elif archive_format == "tar.gz":
+            self.archive = tarfile.open(self.archive_file, 'w:gz')
+        else:
+            self.zstd_stream = open_zstd(open(self.archive_file, 'wb'), "w")
+            self.archive = tarfile.open(fileobj=self.zstd_stream, mode='w|')
+
+    def write_member(self, member_name, payload):
+        """Add one file (bytes) to the archive under member_name"""
+        if self.archive_format == "zip":
+            self.archive.writestr(member_name, payload)
+        else:
+            info = tarfile.TarInfo(member_name)
+            info.size = len(payload)
+            info.mtime = int(time.time())
+            self.archive.addfile(info, io.BytesIO(payload))
+        self.member_count += 1
+
+    def close(self):
+        """Finalize the archive"""
+        if self.archive is None:
+            return
+        self.archive.close()
+        self.archive = None
+        if self.zstd_stream is not None:
+            self.zstd_stream.close()
+        logger.info(f"Archive written: {self.archive_file} ({self.member_count} files)")
+
+
+def read_archived_group(archive_file, member_name):
+    """
+    Read a single group (or processing_summary.json) from an output archive
+    without unpacking anything else. member_name is the path inside the archive,
+    e.g. "horizontal_groups/sheet1/fruits.json".
+
+    Zip archives are read by random access; tar archives are streamed until the
+    member is found.
+    """
+    archive_file = Path(archive_file)
+    name = archive_file.name
+
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(archive_file) as archive:
+            return json.loads(archive.read(member_name).decode('utf-8'))
+
+    if name.endswith(".tar.zst"):
+        with open(archive_file, 'rb') as raw, open_zstd(raw, "r") as stream:
+            return _read_tar_member(tarfile.open(fileobj=stream, mode='r|'), member_name)
+
+    return _read_tar_member(tarfile.open(archive_file, 'r|*'), member_name)
+
+
+def _read_tar_member(archive, member_name):
+    """Scan a streamed tar archive for one member and parse it as JSON"""
+    with archive:
+        for member in archive:
+            if member.name == member_name:
+                return json.loads(archive.extractfile(member).read().decode('utf-8'))
+    raise KeyError(f"'{member_name}' not found in archive")
+
+
+class ColumnarGroupWriter:
+    """
+    Streams grouped data for one sheet/mode into a single Parquet or Arrow IPC file.
+    Every line of every field becomes one row (group_key, field, line_index, value),
+    buffered and flushed as one row group / record batch per batch_rows rows.
+    """
+
+    def __init__(self, output_file, output_format="parquet", batch_rows=65536):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Columnar output requires pyarrow (pip install pyarrow)") from e
+
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {output_format}")
+
+        self.pa = pa
+        self.output_file = Path(output_file)
+        self.output_format = output_format
+        self.batch_rows = max(1, int(batch_rows))
+        self.rows_written = 0
+        self.schema = pa.schema([
+            ("group_key", pa.string()),
+            ("field", pa.string()),
+            ("line_index", pa.int32()),
+            ("value", pa.string())
+        ])
+        self.reset_buffer()
+
+        if output_format == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(str(self.output_file), self.schema)
+        else:
+            self.writer = pa.ipc.new_file(str(self.output_file), self.schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def reset_buffer(self):
+        """Start a new empty batch"""
+        self.buffer = {"group_key": [], "field": [], "line_index": [], "value": []}
+        self.buffered_rows = 0
+
+    def write_group(self, group_key, group_data):
+        """Append one group ({field: [lines]}) to the current batch"""
+        for field, lines in group_data.items():
+            for line_index, value in enumerate(lines):
+                self.buffer["group_key"].append(group_key)
+                self.buffer["field"].append(field)
+                self.buffer["line_index"].append(line_index)
+                self.buffer["value"].append(value)
+            self.buffered_rows += len(lines)
+
+        if self.buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as one row group (Parquet) or record batch (Arrow)"""
+        if not self.buffered_rows:
+            return
+
+        batch = self.pa.RecordBatch.from_pydict(self.buffer, schema=self.schema)
+        if self.output_format == "parquet":
+            self.writer.write_table(self.pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+
+        self.rows_written += self.buffered_rows
+        self.reset_buffer()
+
+    def close(self):
+        """Flush remaining rows and finalize the file"""
+        if self.writer is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+            self.writer = None
+        logger.info(f"Saved: {self.output_file} ({self.rows_written} rows)")
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of completed work, used to resume an interrupted run.
+
+    Each line is a JSON record:
+    - {"fingerprint": {...}} first, identifying the source file and configuration
+    - {"sheet", "mode", "group", "file", "sha256"} for a written group file
+    - {"sheet", "mode", "complete": true, "groups": n} once a sheet/mode is finished
+      (columnar runs record the whole file's "file"/"sha256" here instead)
+
+    Records are buffered and flushed every flush_every records and at the end of
+    each sheet/mode, so the hot path only pays for a buffered line write. Losing
+    the unflushed tail on a crash just means those groups are redone.
+
+    A journal written for another source file revision or configuration is
+    discarded on resume and the run starts over.
+    """
+
+    def __init__(self, journal_file, resume=False, flush_every=256, fingerprint=None):
+        self.journal_file = Path(journal_file)
+        self.base_dir = self.journal_file.parent  # file paths are stored relative to this
+        self.flush_every = flush_every
+        self.pending = 0
+        self.completed_groups = {}  # (sheet, mode) -> {group_key: record}
+        self.completed_sheets = {}  # (sheet, mode) -> record
+        self.fingerprint = fingerprint
+        self.restarted = False
+
+        if resume and self.journal_file.exists() and self.load():
+            self.handle = open(self.journal_file, 'a', encoding='utf-8')
+        else:
+            self.handle = open(self.journal_file, 'w', encoding='utf-8')
+            self.append({"fingerprint": fingerprint})
+            self.flush(sync=True)
+
+    @staticmethod
+    def hash_text(text):
+        """sha256 of the UTF-8 encoded document text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def hash_file(filepath, text=True):
+        """sha256 of a written output file (JSON read back as text, columnar as bytes)"""
+        if text:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return CheckpointJournal.hash_text(f.read())
+
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self):
+        """
+        Read existing records, ignoring a torn last line.
+        Returns False (nothing loaded) if the journal belongs to another source/configuration.
+        """
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if line_number == 0:
+                    if record.get("fingerprint") != self.fingerprint:
+                        logger.warning("Checkpoint journal was written for a different source file or configuration, "
+                                       "starting over")
+                        self.restarted = True
+                        return False
+                    continue
+                key = (record["sheet"], record["mode"])
+                if record.get("complete"):
+                    self.completed_sheets[key] = record
+                else:
+                    self.completed_groups.setdefault(key, {})[record["group"]] = record
+        logger.info(f"Loaded checkpoint journal: {sum(len(g) for g in self.completed_groups.values())} groups, "
+                    f"{len(self.completed_sheets)} sheet/modes completed")
+        return True
+
+    def validate(self):
+        """
+        Keep only records whose output file still exists with the recorded hash.
+        A sheet/mode stays complete only if all of its groups are still valid.
+        """
+        invalid = 0
+        for key, groups in self.completed_groups.items():
+            for group_key, record in list(groups.items()):
+                filepath = self.base_dir / record["file"]
+                if not filepath.is_file() or self.hash_file(filepath) != record["sha256"]:
+                    del groups[group_key]
+                    invalid += 1
+
+        for key, record in list(self.completed_sheets.items()):
+            if "file" in record:
+                filepath = self.base_dir / record["file"]
+                valid = filepath.is_file() and self.hash_file(filepath, text=False) == record["sha256"]
+            else:
+                valid = len(self.completed_groups.get(key, {})) == record["groups"]
+            if not valid:
+                del self.completed_sheets[key]
+                invalid += 1
+
+        if invalid:
+            logger.warning(f"Checkpoint journal: {invalid} records failed validation and will be redone")
+
+    def is_group_done(self, sheet_name, mode, group_key):
+        return group_key in self.completed_groups.get((sheet_name, mode), ())
+
+    def is_sheet_done(self, sheet_name, mode):
+        return (sheet_name, mode) in self.completed_sheets
+
+    def append(self, record):
+        """Buffered append of one record"""
+        self.handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def record_group(self, sheet_name, mode, group_key, filepath, sha256):
+        record = {"sheet": sheet_name, "mode": mode, "group": group_key,
+                  "file": Path(filepath).relative_to(self.base_dir).as_posix(), "sha256": sha256}
+        self.completed_groups.setdefault((sheet_name, mode), {})[group_key] = record
+        self.append(record)
+
+    def record_sheet(self, sheet_name, mode, filepath=None):
+        """Mark a sheet/mode as finished and make the journal durable up to here"""
+        record = {"sheet": sheet_name, "mode": mode, "complete": True,
+                  "groups": len(self.completed_groups.get((sheet_name, mode), {}))}
+        if filepath is not None:
+            record["file"] = Path(filepath).relative_to(self.base_dir).as_posix()
+            record["sha256"] = self.hash_file(filepath, text=False)
+        self.completed_sheets[(sheet_name, mode)] = record
+        self.append(record)
+        self.flush(sync=True)
+
+    def flush(self, sync=False):
+        self.handle.flush()
+        if sync:
+            os.fsync(self.handle.fileno())
+        self.pending = 0
+
+    def close(self):
+        if self.handle is not None:
+            self.flush(sync=True)
+            self.handle.close()
+            self.handle = None
+
+
+class LayoutDetector:
+    """
+    Suggests -hc/-vr/-sc/-sr for a workbook by scoring a small preview of each sheet.
+    Only the first sample_rows rows of every sheet are parsed.
+
+    Candidates are scored on:
+    - fill ratio: share of non-empty cells
+    - cardinality: repeated values make good group keys, all-unique or constant values don't
+    - header-likeness: text (non-numeric) values and a text header cell
+    """
+
+    # Scores below this are not worth suggesting
+    MIN_SCORE = 0.2
+
+    def __init__(self, source_file, sample_rows=50):
+        self.source_file = Path(source_file)
+        self.sample_rows = sample_rows
+
+        if not self.source_file.exists():
+            raise FileNotFoundError(f"Source file not found: {self.source_file}")
+
+    @staticmethod
+    def is_empty(value):
+        """Same emptiness rule the processor uses for keys and cells"""
+        return not value or value.lower() == 'nan'
+
+    @staticmethod
+    def is_numeric(value):
+        """True if the value parses as a number"""
+        try:
+            float(value.replace(',', ''))
+            return True
+        except ValueError:
+            return False
+
+    def score_values(self, values, header=None):
+        """Score one candidate key line (a column or a row) of stripped cell values"""
+        if not values:
+            return 0.0
+
+        filled = [v for v in values if not self.is_empty(v)]
+        if not filled:
+            return 0.0
+
+        fill_ratio = len(filled) / len(values)
+        distinct = len(set(filled))
+        repetition = 1 - distinct / len(filled)
+        text_ratio = sum(1 for v in filled if not self.is_numeric(v)) / len(filled)
+        header_like = 1.0 if header is not None and not self.is_empty(header) and not self.is_numeric(header) else 0.0
+
+        score = fill_ratio * (0.5 * repetition + 0.3 * text_ratio + 0.2 * header_like)
+        # A single distinct value would put everything in one group, all-distinct
+        # values every cell in its own; text alone doesn't make a key
+        if distinct < 2 or distinct == len(filled):
+            score *= 0.5
+        return round(score, 4)
+
+    def is_skippable(self, values, check_index=False):
+        """Leading lines that are (nearly) empty, or running index numbers, are worth skipping"""
+        filled = [v for v in values if not self.is_empty(v)]
+        if len(filled) <= len(values) // 10:
+            return True
+        if check_index and len(filled) == len(values) and len(set(filled)) == len(filled):
+            return all(self.is_numeric(v) for v in filled)
+        return False
+
+    def detect_sheet(self, preview):
+        """Suggest a configuration for one sheet preview (DataFrame of strings)"""
+        matrix = [[str(v).strip() for v in row] for row in preview.itertuples(index=False, name=None)]
+        row_count = len(matrix)
+        column_count = len(preview.columns)
+
+        # Leading rows/columns to skip
+        skip_rows = 0
+        while skip_rows < row_count - 1 and self.is_skippable(matrix[skip_rows]):
+            skip_rows += 1
+
+        columns = [[row[c] for row in matrix[skip_rows:]] for c in range(column_count)]
+        skip_columns = 0
+        while skip_columns < column_count - 1 and self.is_skippable(columns[skip_columns][1:], check_index=True):
+            skip_columns += 1
+
+        # Horizontal key column: values below the header row (the first row kept)
+        column_scores = {
+            c: self.score_values(columns[c][1:], header=matrix[skip_rows][c])
+            for c in range(skip_columns, column_count)
+        }
+        # Vertical key row: values right of the label column. The header row only
+        # names the columns, so it is no key candidate
+        row_scores = {
+            r: self.score_values(matrix[r][skip_columns + 1:])
+            for r in range(skip_rows + 1, row_count)
+        }
+
+        best_column = max(column_scores, key=column_scores.get, default=None)
+        best_row = max(row_scores, key=row_scores.get, default=None)
+
+        return {
+            "horizontal_key_column": best_column if best_column is not None and column_scores[best_column] >= self.MIN_SCORE else None,
+            "vertical_key_row": best_row if best_row is not None and row_scores[best_row] >= self.MIN_SCORE else None,
+            "skip_columns": skip_columns,
+            "skip_rows": skip_rows,
+            "scores": {
+                "horizontal_key_column": column_scores.get(best_column),
+                "vertical_key_row": row_scores.get(best_row)
+            }
+        }
+
+    def detect(self):
+        """
+        Score every sheet's preview and combine the per-sheet suggestions
+        (most common value wins).
+        """
+        start = time.perf_counter()
+        previews = pd.read_excel(
+            self.source_file,
+            sheet_name=None,
+            header=None,
+            nrows=self.sample_rows,
+            keep_default_na=False,
+            dtype=str
+        )
+
+        sheets = {}
+        for sheet_name, preview in previews.items():
+            if preview.empty:
+                logger.warning(f"Sheet '{sheet_name}' is empty, skipping...")
+                continue
+            sheets[sheet_name] = self.detect_sheet(preview)
+
+        suggestion = {}
+        for key in ("horizontal_key_column", "vertical_key_row", "skip_columns", "skip_rows"):
+            votes = Counter(result[key] for result in sheets.values() if result[key] is not None)
+            suggestion[key] = votes.most_common(1)[0][0] if votes else None
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Layout detection finished in {elapsed:.3f}s ({len(sheets)} sheets, {self.sample_rows} rows sampled)")
+
+        return {
+            "source_file": str(self.source_file),
+            "sample_rows": self.sample_rows,
+            "elapsed_seconds": round(elapsed, 4),
+            "suggestion": suggestion,
+            "command_line": self.format_arguments(suggestion),
+            "sheets": sheets
+        }
+
+    @staticmethod
+    def format_arguments(suggestion):
+        """Render a suggestion as the equivalent CLI flags"""
+        flags = []
+        if suggestion.get("horizontal_key_column") is not None:
+            flags.append(f"-hc {suggestion['horizontal_key_column']}")
+        if suggestion.get("vertical_key_row") is not None:
+            flags.append(f"-vr {suggestion['vertical_key_row']}")
+        if suggestion.get("skip_columns"):
+            flags.append(f"-sc {suggestion['skip_columns']}")
+        if suggestion.get("skip_rows"):
+            flags.append(f"-sr {suggestion['skip_rows']}")
+        return " ".join(flags)
+
 
 class DataTableProcessor:
     """
@@ -29,7 +528,12 @@ class DataTableProcessor:
                  horizontal_outer_prefix="",
                  vertical_outer_prefix="",
                  horizontal_data_suffix="",
-                 vertical_data_suffix=""):
+                 vertical_data_suffix="",
+                 output_format="json",
+                 columnar_batch_rows=65536,
+                 archive_format=None,
+                 resume=False,
+                 checkpoint=False):
         """Initialize processor with configuration"""
         self.source_file = Path(source_file)
         self.output_directory = Path(output_directory)
@@ -72,6 +576,32 @@ class DataTableProcessor:
         self.vertical_outer_prefix = str(vertical_outer_prefix) if vertical_outer_prefix else ""
         self.horizontal_data_suffix = str(horizontal_data_suffix) if horizontal_data_suffix else ""
         self.vertical_data_suffix = str(vertical_data_suffix) if vertical_data_suffix else ""
+
+        # Output format - "json" writes one file per group, columnar formats one file per sheet/mode
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        self.output_format = output_format
+        self.columnar_batch_rows = columnar_batch_rows
+
+        # Archive output - group JSON files are streamed into one compressed archive
+        if archive_format is not None:
+            if archive_format not in ARCHIVE_FORMATS:
+                raise ValueError(f"Unsupported archive format '{archive_format}', expected one of {list(ARCHIVE_FORMATS)}")
+            if output_format != "json":
+                raise ValueError("Archive output is only available for the json output format")
+        self.archive_format = archive_format
+        self.archive_file = None
+        self.archive_writer = None
+
+        # Checkpointing - a journal of finished groups lets an interrupted run resume.
+        # It is only written when asked for, so a plain rerun leaves an earlier journal alone
+        if (resume or checkpoint) and archive_format is not None:
+            raise ValueError("Checkpointing and resume are not supported together with archive output")
+        self.resume = resume
+        self.checkpoint = checkpoint or resume
+        self.journal = None
+        self.skipped_groups = 0
+        self.skipped_sheets = 0
         
         # Debug: Print what we received
         logger.info(f"DataTableProcessor initialized with:")
@@ -89,9 +619,12 @@ class DataTableProcessor:
         # Create output directories
         self.horizontal_output_dir = self.output_directory / "horizontal_groups"
         self.vertical_output_dir = self.output_directory / "vertical_groups"
-        os.makedirs(self.horizontal_output_dir, exist_ok=True)
-        os.makedirs(self.vertical_output_dir, exist_ok=True)
         os.makedirs(self.output_directory, exist_ok=True)
+        if self.archive_format:
+            self.archive_file = self.output_directory / (self.source_file.stem + ARCHIVE_FORMATS[self.archive_format])
+        else:
+            os.makedirs(self.horizontal_output_dir, exist_ok=True)
+            os.makedirs(self.vertical_output_dir, exist_ok=True)
 
         if not self.source_file.exists():
             raise FileNotFoundError(f"Source file not found: {self.source_file}")
@@ -130,6 +663,10 @@ class DataTableProcessor:
             
             # Load each sheet
             for sheet_name in self.sheet_identifiers:
+                if self.is_sheet_finished(sheet_name):
+                    logger.info(f"Sheet '{sheet_name}' already completed (checkpoint), skipping...")
+                    self.skipped_sheets += 1
+                    continue
                 try:
                     logger.info(f"Loading sheet: '{sheet_name}'")
                     sheet_data = pd.read_excel(
@@ -151,7 +688,7 @@ class DataTableProcessor:
                     logger.error(f"Error loading sheet '{sheet_name}': {e}")
                     continue
             
-            if not self.data_sheets:
+            if not self.data_sheets and not self.skipped_sheets:
                 raise ValueError("No valid sheets could be loaded")
                 
         except Exception as e:
@@ -178,7 +715,7 @@ class DataTableProcessor:
             result = f"{result}{suffix}"
         return result.upper()
 
-    def process_horizontal_grouping(self, sheet_name, sheet_data, output_dir):
+    def process_horizontal_grouping(self, sheet_name, sheet_data, output_dir, group_writer=None):
         """
         Horizontal grouping: Groups rows by values in a key column
         Example: Group all products by their category
@@ -218,6 +755,10 @@ class DataTableProcessor:
             
             # Process each group
             for group_key in unique_keys:
+                if group_writer is None and self.journal is not None and self.journal.is_group_done(sheet_name, "horizontal", group_key):
+                    self.skipped_groups += 1
+                    continue
+                
                 # Apply outer prefix/suffix
                 json_key = self.apply_outer_prefix_suffix(
                     group_key, 
@@ -258,15 +799,9 @@ class DataTableProcessor:
                                 group_data[header] = []
                             group_data[header].extend(lines)
                 
-                # Save JSON file
+                # Save group
                 if group_data:
-                    output_data = {json_key: group_data}
-                    filename = self.sanitize_filename(group_key) + ".json"
-                    filepath = output_dir / filename
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(output_data, f, indent=2, ensure_ascii=False)
-                    logger.info(f"Saved: {filepath}")
+                    self.save_group(output_dir, group_key, json_key, group_data, group_writer, sheet_name, "horizontal")
             
             return True
             
@@ -274,7 +809,7 @@ class DataTableProcessor:
             logger.error(f"Error in horizontal grouping: {e}")
             return False
 
-    def process_vertical_grouping(self, sheet_name, sheet_data, output_dir):
+    def process_vertical_grouping(self, sheet_name, sheet_data, output_dir, group_writer=None):
         """
         Vertical grouping: Groups columns by values in a key row
         Example: Group specifications by category (AUDIO, BATTERY, etc.)
@@ -313,6 +848,10 @@ class DataTableProcessor:
             
             # Process each group
             for group_key in unique_keys:
+                if group_writer is None and self.journal is not None and self.journal.is_group_done(sheet_name, "vertical", group_key):
+                    self.skipped_groups += 1
+                    continue
+                
                 # Apply outer prefix/suffix
                 json_key = self.apply_outer_prefix_suffix(
                     group_key, 
@@ -370,15 +909,9 @@ class DataTableProcessor:
                                 group_data[row_label] = []
                             group_data[row_label].extend(lines)
                 
-                # Save JSON file
+                # Save group
                 if group_data:
-                    output_data = {json_key: group_data}
-                    filename = self.sanitize_filename(group_key) + ".json"
-                    filepath = output_dir / filename
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(output_data, f, indent=2, ensure_ascii=False)
-                    logger.info(f"Saved: {filepath}")
+                    self.save_group(output_dir, group_key, json_key, group_data, group_writer, sheet_name, "vertical")
             
             return True
             
@@ -386,16 +919,109 @@ class DataTableProcessor:
             logger.error(f"Error in vertical grouping: {e}")
             return False
 
+    def save_group(self, output_dir, group_key, json_key, group_data, group_writer=None, sheet_name=None, mode=None):
+        """Write one group either to its own JSON file or to the sheet's columnar writer"""
+        if group_writer is not None:
+            group_writer.write_group(json_key, group_data)
+            return
+
+        output_data = {json_key: group_data}
+        filename = self.sanitize_filename(group_key) + ".json"
+        filepath = output_dir / filename
+
+        if self.archive_writer is not None:
+            member_name = filepath.relative_to(self.output_directory).as_posix()
+            payload = json.dumps(output_data, indent=2, ensure_ascii=False).encode('utf-8')
+            self.archive_writer.write_member(member_name, payload)
+            logger.info(f"Archived: {member_name}")
+            return
+
+        document = json.dumps(output_data, indent=2, ensure_ascii=False)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(document)
+        logger.info(f"Saved: {filepath}")
+
+        if self.journal is not None:
+            self.journal.record_group(sheet_name, mode, group_key, filepath, CheckpointJournal.hash_text(document))
+
+    def is_sheet_finished(self, sheet_name):
+        """True if every requested mode of this sheet is complete in the checkpoint journal"""
+        if self.journal is None:
+            return False
+        modes = [mode for mode, run in (("horizontal", self.should_run_horizontal()),
+                                        ("vertical", self.should_run_vertical())) if run]
+        return bool(modes) and all(self.journal.is_sheet_done(sheet_name, mode) for mode in modes)
+
+    def run_grouping(self, mode, sheet_name, sheet_data):
+        """
+        Run one grouping mode ("horizontal" or "vertical") for a sheet.
+        JSON output goes to <mode dir>/<sheet>/<group>.json, columnar output
+        to a single <mode dir>/<sheet>.parquet (or .arrow) file.
+        """
+        if mode == "horizontal":
+            grouping_function, mode_output_dir = self.process_horizontal_grouping, self.horizontal_output_dir
+        else:
+            grouping_function, mode_output_dir = self.process_vertical_grouping, self.vertical_output_dir
+
+        if self.journal is not None and self.journal.is_sheet_done(sheet_name, mode):
+            logger.info(f"Sheet '{sheet_name}' {mode} grouping already completed (checkpoint), skipping...")
+            return True
+
+        sheet_dir = mode_output_dir / self.sanitize_filename(sheet_name)
+
+        if self.output_format == "json":
+            if self.archive_writer is None:
+                os.makedirs(sheet_dir, exist_ok=True)
+            success = grouping_function(sheet_name, sheet_data, sheet_dir)
+            columnar_file = None
+        else:
+            columnar_file = sheet_dir.with_name(sheet_dir.name + COLUMNAR_FORMATS[self.output_format])
+            try:
+                with ColumnarGroupWriter(columnar_file, self.output_format, self.columnar_batch_rows) as writer:
+                    success = grouping_function(sheet_name, sheet_data, sheet_dir, writer)
+            except BaseException:
+                columnar_file.unlink(missing_ok=True)
+                raise
+            if not success:
+                # No empty or partial file for a failed sheet, as in JSON mode
+                logger.info(f"Removing incomplete output: {columnar_file}")
+                columnar_file.unlink(missing_ok=True)
+
+        if success and self.journal is not None:
+            self.journal.record_sheet(sheet_name, mode, columnar_file)
+        return success
+
     def sanitize_filename(self, name):
         """Convert string to safe filename"""
         return str(name).lower().replace(' ', '_').replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('?', '_').replace('"', '_').replace('<', '_').replace('>', '_').replace('|', '_')
 
+    def run_fingerprint(self, run_horizontal, run_vertical):
+        """
+        Identity of this run for the checkpoint journal: the source file revision
+        (size and mtime) and every setting that changes the output.
+        """
+        source_stat = self.source_file.stat()
+        return {
+            "source_file": str(self.source_file.resolve()),
+            "source_size": source_stat.st_size,
+            "source_mtime_ns": source_stat.st_mtime_ns,
+            "modes": {"horizontal": bool(run_horizontal), "vertical": bool(run_vertical)},
+            "output_format": self.output_format,
+            "skip_columns": self.skip_columns,
+            "skip_rows": self.skip_rows,
+            "horizontal_key_column": self.horizontal_key_column,
+            "vertical_key_row": self.vertical_key_row,
+            "horizontal_inner_prefix": self.horizontal_inner_prefix,
+            "horizontal_outer_prefix": self.horizontal_outer_prefix,
+            "vertical_inner_prefix": self.vertical_inner_prefix,
+            "vertical_outer_prefix": self.vertical_outer_prefix,
+            "horizontal_data_suffix": self.horizontal_data_suffix,
+            "vertical_data_suffix": self.vertical_data_suffix
+        }
+
     def process(self):
         """Main processing function"""
         try:
-            # Load data
-            self.load_data_sheets()
-            
             # Determine which processing modes to run based on input parameters
             run_horizontal = self.should_run_horizontal()
             run_vertical = self.should_run_vertical()
@@ -406,8 +1032,21 @@ class DataTableProcessor:
                 logger.info("For vertical grouping: specify -vr (vertical row) or use -vip/-vop (vertical prefixes)")
                 return False
             
+            # Open the checkpoint journal (validating earlier output when resuming)
+            if self.checkpoint:
+                self.journal = CheckpointJournal(self.output_directory / ".checkpoint_journal.jsonl", resume=self.resume,
+                                                 fingerprint=self.run_fingerprint(run_horizontal, run_vertical))
+                if self.resume:
+                    self.journal.validate()
+            
+            # Load data
+            self.load_data_sheets()
+            
             logger.info(f"Processing modes: Horizontal={run_horizontal}, Vertical={run_vertical}")
             
+            if self.archive_format:
+                self.archive_writer = GroupArchiveWriter(self.archive_file, self.archive_format)
+            
             success_count = 0
             
             # Process each sheet
@@ -416,16 +1055,12 @@ class DataTableProcessor:
                 
                 # Run horizontal grouping if requested
                 if run_horizontal:
-                    h_dir = self.horizontal_output_dir / self.sanitize_filename(sheet_name)
-                    os.makedirs(h_dir, exist_ok=True)
-                    h_success = self.process_horizontal_grouping(sheet_name, sheet_data, h_dir)
+                    h_success = self.run_grouping("horizontal", sheet_name, sheet_data)
                     sheet_success = sheet_success or h_success
                 
                 # Run vertical grouping if requested  
                 if run_vertical:
-                    v_dir = self.vertical_output_dir / self.sanitize_filename(sheet_name)
-                    os.makedirs(v_dir, exist_ok=True)
-                    v_success = self.process_vertical_grouping(sheet_name, sheet_data, v_dir)
+                    v_success = self.run_grouping("vertical", sheet_name, sheet_data)
                     sheet_success = sheet_success or v_success
                 
                 if sheet_success:
@@ -434,12 +1069,21 @@ class DataTableProcessor:
             # Save summary
             summary = {
                 "source_file": str(self.source_file),
-                "sheets_processed": success_count,
+                "sheets_processed": success_count + self.skipped_sheets,
                 "total_sheets": len(self.sheet_identifiers),
                 "processing_modes": {
                     "horizontal": run_horizontal,
                     "vertical": run_vertical
                 },
+                "output_format": self.output_format,
+                "archive": str(self.archive_file) if self.archive_file else None,
+                "resume": {
+                    "enabled": self.resume,
+                    "checkpoint": self.checkpoint,
+                    "skipped_sheets": self.skipped_sheets,
+                    "skipped_groups": self.skipped_groups,
+                    "restarted": self.journal is not None and self.journal.restarted
+                },
                 "configuration": {
                     "skip_columns": self.skip_columns,
                     "skip_rows": self.skip_rows,
@@ -452,16 +1096,29 @@ class DataTableProcessor:
                 }
             }
             
-            summary_file = self.output_directory / "processing_summary.json"
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, indent=2)
+            if self.archive_writer is not None:
+                summary_file = f"{self.archive_file}:processing_summary.json"
+                self.archive_writer.write_member("processing_summary.json",
+                                                 json.dumps(summary, indent=2).encode('utf-8'))
+            else:
+                summary_file = self.output_directory / "processing_summary.json"
+                with open(summary_file, 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, indent=2)
             
             logger.info(f"Processing complete! Summary saved to: {summary_file}")
-            return success_count > 0
+            return success_count + self.skipped_sheets > 0
             
         except Exception as e:
             logger.error(f"Processing failed: {e}")
             return False
+        
+        finally:
+            if self.archive_writer is not None:
+                self.archive_writer.close()
+                self.archive_writer = None
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
 
 
 def main():
@@ -490,6 +1147,33 @@ def main():
     parser.add_argument('-hs', '--horizontal-suffix', default='', help="Suffix for horizontal outer keys")
     parser.add_argument('-vs', '--vertical-suffix', default='', help="Suffix for vertical outer keys")
     
+    # Output format
+    parser.add_argument('-f', '--output-format', choices=OUTPUT_FORMATS, default='json',
+                        help="json: one file per group (default); parquet/arrow: one columnar file per sheet and mode "
+                             "with columns group_key, field, line_index, value")
+    parser.add_argument('--batch-rows', type=int, default=65536,
+                        help="Rows per row group / record batch for columnar output (default: 65536)")
+    
+    parser.add_argument('-a', '--archive', choices=list(ARCHIVE_FORMATS),
+                        help="Stream JSON output into a single compressed archive (<source name>.zip/.tar.gz/.tar.zst) "
+                             "instead of loose files")
+    
+    parser.add_argument('--resume', action='store_true',
+                        help="Resume an interrupted run: skip sheets/groups recorded in the checkpoint journal "
+                             "whose output files still validate (implies --checkpoint)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="Record finished groups in a checkpoint journal (.checkpoint_journal.jsonl) "
+                             "so an interrupted run can be resumed with --resume")
+    
+    # Layout detection
+    parser.add_argument('--detect', action='store_true',
+                        help="Suggest -hc/-vr/-sc/-sr from a preview of each sheet and exit")
+    parser.add_argument('--detect-rows', type=int, default=50,
+                        help="Rows per sheet to sample for --detect (default: 50)")
+    parser.add_argument('--apply-detected', action='store_true',
+                        help="Detect the layout as --detect does (implied), then continue processing using the "
+                             "suggestion (explicit flags still win)")
+    
     args = parser.parse_args()
     
     # Debug: Print the arguments
@@ -500,6 +1184,29 @@ def main():
     logger.info(f"  skip_columns: {args.skip_columns}")
     logger.info(f"  vertical_row: {args.vertical_row}")
     
+    # Layout detection - fills in only what the user did not specify
+    if args.detect or args.apply_detected:
+        try:
+            detection = LayoutDetector(args.source, args.detect_rows).detect()
+        except Exception as e:
+            logger.error(f"Layout detection failed: {e}")
+            return
+
+        print(json.dumps(detection, indent=2, ensure_ascii=False))
+        if not args.apply_detected:
+            return
+
+        suggestion = detection["suggestion"]
+        if args.horizontal_column is None and suggestion["horizontal_key_column"] is not None:
+            args.horizontal_column = str(suggestion["horizontal_key_column"])
+        if args.vertical_row is None and suggestion["vertical_key_row"] is not None:
+            args.vertical_row = suggestion["vertical_key_row"]
+        if not args.skip_columns and suggestion["skip_columns"]:
+            args.skip_columns = str(suggestion["skip_columns"])
+        if not args.skip_rows and suggestion["skip_rows"]:
+            args.skip_rows = str(suggestion["skip_rows"])
+        logger.info(f"Applying detected layout: {detection['command_line']}")
+    
     # Convert skip parameters
     skip_columns = args.skip_columns
     skip_rows = args.skip_rows
@@ -529,7 +1236,12 @@ def main():
             horizontal_outer_prefix=args.horizontal_outer_prefix,
             vertical_outer_prefix=args.vertical_outer_prefix,
             horizontal_data_suffix=args.horizontal_suffix,
-            vertical_data_suffix=args.vertical_suffix
+            vertical_data_suffix=args.vertical_suffix,
+            output_format=args.output_format,
+            columnar_batch_rows=args.batch_rows,
+            archive_format=args.archive,
+            resume=args.resume,
+            checkpoint=args.checkpoint
         )
         
         if processor.process():
@@ -1,42 +1,1003 @@
 import os
 import csv
+import time
+import json
+import mmap
+import stat
+import struct
+import array
+import hashlib
+import sqlite3
+import errno
+import select
+import signal
+import ctypes
+import ctypes.util
+import fnmatch
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-def generate_flexible_csv(root_dir, output_csv):
+
+def file_extension(name):
+    """Lowercase extension without the dot, same result as os.path.splitext(name)[1][1:].lower()."""
+    dot = name.rfind('.')
+    # Leading dots (".png", "..png") don't start an extension
+    if dot <= 0 or (name[0] == '.' and not name[:dot].lstrip('.')):
+        return ""
+    return name[dot + 1:].lower()
+
+
+class DirectorySnapshot:
+    """
+    Read side of a directory snapshot: per-folder mtime, file names and
+    subfolder names from a previous scan, stored in SQLite.
+
+    Each walker thread gets its own read-only connection. A snapshot taken
+    from a different root folder is ignored.
+    """
+
+    def __init__(self, db_path, root_dir):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.usable = False
+        if os.path.exists(db_path):
+            try:
+                root = self.connection().execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+                self.usable = root is not None and root[0] == os.path.abspath(root_dir)
+            except sqlite3.DatabaseError as e:
+                print(f"⚠️ Ignoring unreadable snapshot {db_path}: {e}")
+
+    def connection(self):
+        if not hasattr(self.local, "db"):
+            self.local.db = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        return self.local.db
+
+    def lookup(self, key, mtime_ns):
+        """(files, subdirs) recorded for folder `key` if its mtime is unchanged, else None."""
+        if not self.usable:
+            return None
+        row = self.connection().execute("SELECT mtime_ns, files, subdirs FROM dirs WHERE path = ?", (key,)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1]), json.loads(row[2])
+
+
+class SnapshotWriter:
+    """
+    Write side of a directory snapshot. Rows go to a temporary database that
+    replaces the previous snapshot atomically once the scan completes.
+    """
+
+    def __init__(self, db_path, root_dir):
+        self.db_path = db_path
+        self.temp_path = f"{db_path}.tmp"
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.db = sqlite3.connect(self.temp_path)
+        self.db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, files TEXT, subdirs TEXT)")
+        self.db.execute("INSERT INTO meta VALUES ('root', ?)", (os.path.abspath(root_dir),))
+
+    def record(self, key, mtime_ns, files, subdirs):
+        self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                        (key, mtime_ns, json.dumps(files, ensure_ascii=False), json.dumps(subdirs, ensure_ascii=False)))
+
+    def commit(self):
+        self.db.commit()
+        self.db.close()
+        os.replace(self.temp_path, self.db_path)
+
+    def discard(self):
+        self.db.close()
+        os.remove(self.temp_path)
+
+
+# Directories listed ahead of the consumer, per worker thread
+SCAN_LOOKAHEAD_PER_WORKER = 4
+
+
+def list_directory(path, parts, snapshot=None):
+    """
+    List one directory with os.scandir.
+
+    Follows os.walk defaults: symlinks to directories are listed but not entered,
+    and unreadable directories are skipped. With a snapshot, a directory whose
+    mtime is unchanged reuses its recorded listing instead of being re-listed
+    (its subdirectories are still checked).
+
+    Returns (parts, file names, listing record) in listing order,
+    or None if the directory can't be read. The record is
+    (mtime_ns, file names, subdir names, rescanned).
+    """
+    mtime_ns = None
+    cached = None
+    if snapshot is not None:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = snapshot.lookup(os.sep.join(parts), mtime_ns)
+
+    if cached is not None:
+        files, subdir_names = cached
+    else:
+        files = []
+        subdir_names = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                        continue
+                    try:
+                        is_symlink = entry.is_symlink()
+                    except OSError:
+                        is_symlink = False
+                    if not is_symlink:
+                        subdir_names.append(entry.name)
+        except OSError:
+            return None
+
+    return parts, files, (mtime_ns, files, subdir_names, cached is None)
+
+
+def scan_tree(root_dir, workers=8, stats=None, snapshot_db=None):
+    """
+    Walk root_dir with os.scandir on a thread pool of `workers` threads.
+
+    Yields (parts, file names) per directory in the same top-down order as
+    os.walk, where parts are the folder names relative to root_dir.
+    Folders and files seen are counted in `stats`.
+
+    Only the next SCAN_LOOKAHEAD_PER_WORKER * workers directories in walk
+    order are listed ahead of the caller, so memory stays flat however large
+    the tree is: listings never pile up faster than they are consumed.
+
+    With snapshot_db, folders unchanged since the previous run (same mtime)
+    are not re-listed, and the snapshot is refreshed once the walk completes;
+    `stats` then also counts "rescanned" and "skipped" folders.
+    """
+    if stats is None:
+        stats = {"dirs": 0, "files": 0}
+    snapshot = writer = None
+    if snapshot_db:
+        snapshot = DirectorySnapshot(snapshot_db, root_dir)
+        writer = SnapshotWriter(snapshot_db, root_dir)
+        stats.update(rescanned=0, skipped=0)
+
+    lookahead = SCAN_LOOKAHEAD_PER_WORKER * workers
+    completed = False
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Stack of [path, parts, future]; the future is None until the entry is
+        # among the next `lookahead` directories to visit
+        pending = [[root_dir, [], None]]
+        try:
+            while pending:
+                for entry in pending[:-lookahead - 1:-1]:
+                    if entry[2] is None:
+                        entry[2] = executor.submit(list_directory, entry[0], entry[1], snapshot)
+                path, _, future = pending.pop()
+                listing = future.result()
+                if listing is None:
+                    continue
+                parts, files, (mtime_ns, _, subdir_names, rescanned) = listing
+                stats["dirs"] += 1
+                stats["files"] += len(files)
+                if writer is not None:
+                    writer.record(os.sep.join(parts), mtime_ns, files, subdir_names)
+                    stats["rescanned" if rescanned else "skipped"] += 1
+                yield parts, files
+                # Stack in reverse so the first subdirectory is visited next (preorder)
+                pending.extend([os.path.join(path, name), parts + [name], None]
+                               for name in reversed(subdir_names))
+            completed = True
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Only a complete walk may replace the previous snapshot
+            if writer is not None and completed:
+                writer.commit()
+            elif writer is not None:
+                writer.discard()
+
+
+def spill_file_for(output_csv):
+    """Temporary file next to the output CSV, removed by the caller."""
+    fd, spill_path = tempfile.mkstemp(prefix=".", suffix=".spill.csv",
+                                      dir=os.path.dirname(os.path.abspath(output_csv)))
+    os.close(fd)
+    return spill_path
+
+
+# Spill rows are: file, extension, width, height, folder parts...
+SPILL_FIELDS = 4
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# PNG caps width and height at 2**31-1, which also keeps them within int32 columns
+MAX_IMAGE_DIMENSION = 2**31 - 1
+
+# JPEG start-of-frame markers (all except DHT C4, JPG C8 and DAC CC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+def jpeg_dimensions(f):
+    """Walk JPEG marker segments up to the first SOF, seeking over the others."""
+    while True:
+        byte = f.read(1)
+        if byte != b'\xff':
+            return None
+        marker = f.read(1)
+        # Fill bytes: any number of 0xFF may precede a marker
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker or marker in (b'\xd9', b'\xda'):
+            # End of image or start of scan before any frame header
+            return None
+        code = marker[0]
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if code in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        if length < 2:
+            return None
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_dimensions(path):
+    """
+    (width, height) read from the PNG IHDR chunk or the JPEG SOF marker only,
+    usually a few hundred bytes per file; None for other or corrupt files.
+    The format is taken from the file's signature, not its extension.
+    Sizes outside 1..2**31-1 (the PNG limit) are treated as corrupt.
+    """
+    dimensions = None
+    try:
+        with open(path, 'rb', buffering=1024) as f:
+            head = f.read(24)
+            if head[:8] == PNG_SIGNATURE and head[12:16] == b'IHDR':
+                dimensions = struct.unpack('>II', head[16:24])
+            elif head[:2] == b'\xff\xd8':
+                f.seek(2)
+                dimensions = jpeg_dimensions(f)
+    except (OSError, struct.error):
+        return None
+    if dimensions and all(0 < size <= MAX_IMAGE_DIMENSION for size in dimensions):
+        return dimensions
+    return None
+
+
+def iter_spill_paths(spill_path, root_dir):
+    """Yield (row index, path relative to root_dir, full path) for every row of a spill file."""
+    with open(spill_path, mode='r', newline='', encoding='utf-8') as spill:
+        for index, row in enumerate(csv.reader(spill)):
+            rel_path = os.path.join(*row[SPILL_FIELDS:], row[0])
+            yield index, rel_path, os.path.join(root_dir, rel_path)
+
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def file_size(path):
+    """Size of a regular file; -1 for symlinks (they don't occupy a copy) and unreadable files."""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return -1
+    return info.st_size if stat.S_ISREG(info.st_mode) else -1
+
+
+def hash_file(path):
+    """BLAKE2b-128 of a file's content via a memory-mapped read ("" if unreadable)."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                # hashlib releases the GIL on large buffers, so threads hash in parallel
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+    except (OSError, ValueError):
+        return ""
+    return digest.hexdigest()
+
+
+def find_duplicates(spill_path, root_dir, workers=8, batch_size=1024):
+    """
+    Find files with identical content among the rows of a spill file.
+
+    Sizes are collected first (stat only); only files sharing their size with
+    another file are hashed, so unique-sized files are never read.
+
+    Returns (hashes by row index, duplicate groups sorted by reclaimable bytes).
+    """
+    sizes = array.array('q')
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in iter_batches(iter_spill_paths(spill_path, root_dir), batch_size):
+            sizes.extend(executor.map(file_size, [full_path for _, _, full_path in batch]))
+
+        size_counts = Counter(sizes)
+        candidates = {size for size, count in size_counts.items() if count > 1 and size >= 0}
+        print(f"Duplicate check: {sum(size_counts[size] for size in candidates)} of {len(sizes)} files share a size and are hashed")
+
+        hashes = {}
+        by_hash = defaultdict(list)
+        candidate_rows = ((index, rel_path, full_path) for index, rel_path, full_path
+                          in iter_spill_paths(spill_path, root_dir) if sizes[index] in candidates)
+        for batch in iter_batches(candidate_rows, batch_size):
+            for (index, rel_path, _), digest in zip(batch, executor.map(hash_file, [row[2] for row in batch])):
+                if digest:
+                    hashes[index] = digest
+                    by_hash[(digest, sizes[index])].append(rel_path)
+
+    groups = [{"hash": digest, "size": size, "count": len(paths),
+               "reclaimable_bytes": size * (len(paths) - 1), "files": paths}
+              for (digest, size), paths in by_hash.items() if len(paths) > 1]
+    groups.sort(key=lambda group: group["reclaimable_bytes"], reverse=True)
+    return hashes, groups
+
+
+DEFAULT_EXTENSIONS = ("png", "jpg")
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+def matches_filters(rel_path, include=None, exclude=None):
+    """Glob filters on the '/'-separated path relative to the root: any include must match, no exclude may."""
+    if include and not any(fnmatch.fnmatch(rel_path, pattern) for pattern in include):
+        return False
+    return not (exclude and any(fnmatch.fnmatch(rel_path, pattern) for pattern in exclude))
+
+
+def normalize_extensions(extensions):
+    """Lowercase extensions without dots; None stays None (every extension)."""
+    return None if extensions is None else {ext.lower().lstrip('.') for ext in extensions}
+
+
+def matching_extension(parts, name, allowed_extensions, include=None, exclude=None):
+    """Extension of a file that passes the extension and glob filters, else None."""
+    extension = file_extension(name)  # lowercase without dot
+    if allowed_extensions is not None and extension not in allowed_extensions:
+        return None
+    if (include or exclude) and not matches_filters("/".join(parts + [name]), include, exclude):
+        return None
+    return extension
+
+
+def iter_file_records(root_dir, extensions=DEFAULT_EXTENSIONS, include=None, exclude=None,
+                      workers=8, snapshot_db=None, dimensions=False, stats=None):
+    """
+    Lazily yield one record per matching file under root_dir, in os.walk order.
+
+    Records are dicts with "levels" (folder names relative to root_dir), "file"
+    and "extension" (lowercase, without dot), plus "width" and "height" (None if
+    unreadable) when dimensions=True. Nothing is printed and nothing is kept
+    beyond a bounded window of records waiting for their image header.
+
+    extensions=None matches every extension; include/exclude are glob patterns
+    matched against the relative path, e.g. "photos/*" or "*_thumb.png".
+    """
+    allowed_extensions = normalize_extensions(extensions)
+
+    def with_dimensions(record, future):
+        record["width"], record["height"] = future.result() or (None, None)
+        return record
+
+    with ThreadPoolExecutor(max_workers=workers) as header_pool:
+        # Image headers are read on their own pool while the walk continues;
+        # records wait here (bounded) so they are yielded in walk order
+        in_flight = deque()
+
+        for parts, files in scan_tree(root_dir, workers, stats, snapshot_db):
+            for f in files:
+                extension = matching_extension(parts, f, allowed_extensions, include, exclude)
+                if extension is None:
+                    continue
+                record = {"levels": parts, "file": f, "extension": extension}
+                if not dimensions:
+                    yield record
+                    continue
+                in_flight.append((record, header_pool.submit(image_dimensions, os.path.join(root_dir, *parts, f))))
+                while in_flight and (len(in_flight) > workers * 64 or in_flight[0][1].done()):
+                    yield with_dimensions(*in_flight.popleft())
+
+        while in_flight:
+            yield with_dimensions(*in_flight.popleft())
+
+
+def iter_spill_records(spill_path, dimensions=False, hashes=None):
+    """Read records back from a spill file, adding the hash of each row when hashes are given."""
+    with open(spill_path, mode='r', newline='', encoding='utf-8') as spill:
+        for index, row in enumerate(csv.reader(spill)):
+            filename, extension, width, height = row[:SPILL_FIELDS]
+            record = {"levels": row[SPILL_FIELDS:], "file": filename, "extension": extension}
+            if dimensions:
+                record["width"] = int(width) if width else None
+                record["height"] = int(height) if height else None
+            if hashes is not None:
+                record["hash"] = hashes.get(index) or None
+            yield record
+
+
+def write_csv(records, output_path, max_levels, dimensions=False, with_hash=False):
+    headers = [f"Level {i+1}" for i in range(max_levels)] + ["File", "Extension"]
+    if dimensions:
+        headers += ["Width", "Height"]
+    if with_hash:
+        headers.append("Hash")
+
+    with open(output_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        for record in records:
+            parts = record["levels"]
+            levels = parts + [""] * (max_levels - len(parts))
+            output_row = levels + [record["file"], record["extension"]]
+            if dimensions:
+                output_row += ["" if record["width"] is None else record["width"],
+                               "" if record["height"] is None else record["height"]]
+            if with_hash:
+                output_row.append(record["hash"] or "")
+            writer.writerow(output_row)
+
+
+def write_jsonl(records, output_path):
+    with open(output_path, mode='w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def write_parquet(records, output_path, dimensions=False, with_hash=False, batch_rows=65536):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+
+    fields = [("levels", pa.list_(pa.string())), ("file", pa.string()), ("extension", pa.string())]
+    if dimensions:
+        fields += [("width", pa.int32()), ("height", pa.int32())]
+    if with_hash:
+        fields.append(("hash", pa.string()))
+    schema = pa.schema(fields)
+
+    with pq.ParquetWriter(str(output_path), schema) as writer:
+        for batch in iter_batches(records, batch_rows):
+            writer.write_table(pa.table({name: [record[name] for record in batch] for name, _ in fields}, schema=schema))
+
+
+def output_format_for(output_path):
+    """Output format from the file suffix: .jsonl/.ndjson, .parquet, otherwise CSV."""
+    suffix = os.path.splitext(output_path)[1].lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".parquet":
+        return "parquet"
+    return "csv"
+
+
+def generate_inventory(root_dir, output_path, output_format=None, extensions=DEFAULT_EXTENSIONS,
+                       include=None, exclude=None, workers=8, snapshot_db=None, duplicates=False, dimensions=False):
+    """
+    Walk root_dir and write an inventory of matching files as CSV, JSONL or Parquet.
+
+    Returns the number of files written.
+    """
+    output_format = output_format or output_format_for(output_path)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format} (choose from {', '.join(OUTPUT_FORMATS)})")
     print(f"Looking in: {root_dir}")
 
-    allowed_extensions = {"png", "jpg"}
-    rows = []
+    matched = 0
     max_levels = 0
+    unreadable_images = 0
+    stats = {"dirs": 0, "files": 0}
+    started = time.perf_counter()
+
+    # Records are streamed to a spill file as they are found (file, extension, width, height,
+    # folder parts), so memory stays flat; the CSV header needs max_levels and the
+    # duplicate check needs every size, which are only known at the end
+    spill_path = spill_file_for(output_path)
+    try:
+        with open(spill_path, mode='w', newline='', encoding='utf-8') as spill:
+            spill_writer = csv.writer(spill)
 
-    # Walk through the directory tree
-    for current_path, _, files in os.walk(root_dir):
-        for f in files:
-            extension = os.path.splitext(f)[1][1:].lower()  # lowercase without dot
-            if extension in allowed_extensions:
-                rel_path = os.path.relpath(current_path, root_dir)
-                parts = rel_path.split(os.sep) if rel_path != '.' else []
+            # Walk through the directory tree
+            for record in iter_file_records(root_dir, extensions, include, exclude, workers,
+                                            snapshot_db, dimensions, stats):
+                parts = record["levels"]
                 max_levels = max(max_levels, len(parts))
-                rows.append((parts, f, extension))
+                width = height = ""
+                if dimensions:
+                    if record["width"] is None:
+                        unreadable_images += 1
+                    else:
+                        width, height = record["width"], record["height"]
+                spill_writer.writerow([record["file"], record["extension"], width, height] + parts)
+                matched += 1
 
-    print(f"\nMax folder depth: {max_levels}")
-    print(f"Filtered files found: {len(rows)}")
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"\nScanned {stats['dirs']} folders and {stats['files']} files in {elapsed:.2f}s "
+              f"({stats['dirs'] / elapsed:.0f} folders/s, {stats['files'] / elapsed:.0f} files/s)")
+        if snapshot_db:
+            print(f"Snapshot {snapshot_db}: {stats['skipped']} folders unchanged, {stats['rescanned']} rescanned")
+        print(f"Max folder depth: {max_levels}")
+        print(f"Filtered files found: {matched}")
+        if dimensions:
+            print(f"Images without readable dimensions: {unreadable_images}")
 
-    if rows:
-        headers = [f"Level {i+1}" for i in range(max_levels)] + ["File", "Extension"]
+        # Optional duplicate detection adds a Hash column and a duplicate groups report
+        hashes = None
+        if duplicates and matched:
+            hashes, groups = find_duplicates(spill_path, root_dir, workers)
+            report_path = os.path.splitext(output_path)[0] + "_duplicates.json"
+            reclaimable = sum(group["reclaimable_bytes"] for group in groups)
+            with open(report_path, mode='w', encoding='utf-8') as report:
+                json.dump({"root": root_dir, "duplicate_groups": len(groups),
+                           "reclaimable_bytes": reclaimable, "groups": groups}, report, indent=2, ensure_ascii=False)
+            print(f"Duplicate groups: {len(groups)}, reclaimable: {reclaimable} bytes - report: {report_path}")
 
-        with open(output_csv, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(headers)
-            for parts, filename, extension in rows:
-                levels = parts + [""] * (max_levels - len(parts))
-                writer.writerow(levels + [filename, extension])
+        if matched:
+            # One sequential pass over the spill file writes the output
+            records = iter_spill_records(spill_path, dimensions, hashes)
+            if output_format == "csv":
+                write_csv(records, output_path, max_levels, dimensions, hashes is not None)
+            elif output_format == "jsonl":
+                write_jsonl(records, output_path)
+            else:
+                write_parquet(records, output_path, dimensions, hashes is not None)
+
+            print(f"\n✅ {output_format.upper()} written to: {output_path}")
+        else:
+            print("\n⚠️ No matching files found under the given directory.")
+    finally:
+        os.remove(spill_path)
+    return matched
+
+
+def generate_flexible_csv(root_dir, output_csv, **options):
+    """CSV inventory of the files under root_dir (see generate_inventory for options)."""
+    return generate_inventory(root_dir, output_csv, "csv", **options)
+
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+# struct inotify_event header: int wd; uint32_t mask, cookie, len
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    """
+    Minimal Linux inotify binding through ctypes.
+
+    Raises OSError if inotify isn't available (other platforms, no libc symbol,
+    or the instance limit is reached); callers fall back to polling.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not supported on this platform")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """All pending events as (wd, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+# Folder mtimes can be this coarse (FAT: 2s), so "changed since" checks allow for it
+RELIST_MTIME_SLACK_NS = 2 * 10**9
+
+
+class InventoryDaemon:
+    """
+    Keeps an in-memory inventory of a folder tree current and flushes it to a
+    CSV, JSONL or Parquet file.
+
+    One initial scan builds the index (folder parts -> {file name: record});
+    after that, Linux inotify events update it incrementally. Where inotify
+    isn't available (or the watch limit is hit) the tree is re-listed every
+    poll_interval seconds instead, optionally using a snapshot so unchanged
+    folders aren't re-listed.
+
+    Writes are debounced: a flush happens once no change has arrived for
+    `debounce` seconds, or at the latest `max_delay` seconds after the first
+    unflushed change. Each flush writes a temporary file and renames it over
+    the output, so readers never see a partial inventory. Rows are sorted by
+    path.
+    """
+
+    def __init__(self, root_dir, output_path, output_format=None, extensions=DEFAULT_EXTENSIONS,
+                 include=None, exclude=None, workers=8, dimensions=False, snapshot_db=None,
+                 debounce=2.0, max_delay=30.0, poll_interval=30.0, use_inotify=True):
+        self.root_dir = root_dir
+        self.output_path = output_path
+        self.output_format = output_format or output_format_for(output_path)
+        self.allowed_extensions = normalize_extensions(extensions)
+        self.include = include
+        self.exclude = exclude
+        self.workers = workers
+        self.dimensions = dimensions
+        self.snapshot_db = snapshot_db
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        # The umask can only be read by setting it
+        self.umask = os.umask(0)
+        os.umask(self.umask)
+
+        self.index = {}          # folder parts tuple -> {file name: record}
+        self.watches = {}        # watch descriptor -> folder parts tuple
+        self.folder_watches = {}  # folder parts tuple -> watch descriptor
+        self.inotify = None
+        self.first_change = None
+        self.last_change = None
+        self.stopped = False
+
+    def folder_path(self, parts):
+        return os.path.join(self.root_dir, *parts)
+
+    def make_records(self, parts, names):
+        """Records for the files among `names` that pass the filters."""
+        records = {}
+        for name in names:
+            extension = matching_extension(list(parts), name, self.allowed_extensions, self.include, self.exclude)
+            if extension is not None:
+                records[name] = {"levels": list(parts), "file": name, "extension": extension}
+        if self.dimensions and records:
+            paths = [os.path.join(self.folder_path(parts), name) for name in records]
+            with ThreadPoolExecutor(max_workers=self.workers) as header_pool:
+                for record, size in zip(records.values(), header_pool.map(image_dimensions, paths)):
+                    record["width"], record["height"] = size or (None, None)
+        return records
+
+    def mark_changed(self):
+        now = time.monotonic()
+        self.last_change = now
+        if self.first_change is None:
+            self.first_change = now
+
+    def sync_folder(self, parts, names):
+        """Bring one folder's entries in line with a fresh listing; unchanged files keep their records."""
+        current = self.index.get(parts, {})
+        listed = set(names)
+        updated = {name: record for name, record in current.items() if name in listed}
+        updated.update(self.make_records(parts, [name for name in names if name not in current]))
+        if updated.keys() != current.keys():
+            self.mark_changed()
+        self.index[parts] = updated
+
+    def list_folder(self, parts):
+        """(file names, subfolder names) of one folder, split like scan_tree does; None if unreadable."""
+        files = []
+        subdir_names = []
+        try:
+            with os.scandir(self.folder_path(parts)) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                        continue
+                    try:
+                        is_symlink = entry.is_symlink()
+                    except OSError:
+                        is_symlink = False
+                    if not is_symlink:
+                        subdir_names.append(entry.name)
+        except OSError:
+            return None
+        return files, subdir_names
+
+    def scan(self, parts=()):
+        """(Re)scan the tree below `parts`, adding inotify watches for every folder found."""
+        parts = tuple(parts)
+        # The top folder is watched before it's listed. Its subfolders can only be
+        # watched once the walk finds them, so any that changed since the walk
+        # started are listed again after their watch is in place.
+        self.watch_folder(parts)
+        walk_started_ns = time.time_ns() - RELIST_MTIME_SLACK_NS
+        seen = set()
+        late_folders = set()
+        for sub_parts, files in scan_tree(self.folder_path(parts), self.workers,
+                                          snapshot_db=self.snapshot_db if not parts else None):
+            folder = parts + tuple(sub_parts)
+            seen.add(folder)
+            if self.watch_folder(folder) and self.changed_since(folder, walk_started_ns):
+                listing = self.list_folder(folder)
+                if listing is not None:
+                    files, subdir_names = listing
+                    late_folders.update(folder + (name,) for name in subdir_names)
+            self.sync_folder(folder, files)
+        # Subfolders created after their parent was listed
+        for folder in sorted(late_folders - seen):
+            seen |= self.scan(folder)
+        # Folders that disappeared since the last scan
+        for folder in [f for f in self.index if f[:len(parts)] == parts and f not in seen]:
+            self.drop_folder(folder)
+        return seen
+
+    def changed_since(self, parts, time_ns):
+        try:
+            return os.stat(self.folder_path(parts)).st_mtime_ns >= time_ns
+        except OSError:
+            return False
+
+    def watch_folder(self, parts):
+        """Add an inotify watch for a folder; True if a new watch was added."""
+        if parts in self.folder_watches or self.inotify is None:
+            return False
+        try:
+            wd = self.inotify.add_watch(self.folder_path(parts))
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                print("⚠️ inotify watch limit reached (fs.inotify.max_user_watches), falling back to polling")
+                self.stop_inotify()
+            # Other errors: the folder vanished or can't be read; the scan skips it too
+            return False
+        self.watches[wd] = parts
+        self.folder_watches[parts] = wd
+        return True
+
+    def drop_folder(self, parts):
+        """Forget a folder and everything below it."""
+        for folder in [f for f in self.index if f[:len(parts)] == parts]:
+            if self.index.pop(folder):
+                self.mark_changed()
+        for folder in [f for f in self.folder_watches if f[:len(parts)] == parts]:
+            wd = self.folder_watches.pop(folder)
+            self.watches.pop(wd, None)
+            if self.inotify is not None:
+                self.inotify.rm_watch(wd)
+
+    def stop_inotify(self):
+        if self.inotify is not None:
+            self.inotify.close()
+        self.inotify = None
+        self.watches.clear()
+        self.folder_watches.clear()
+
+    def handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost: resynchronize the whole tree
+            print("⚠️ inotify queue overflow, rescanning")
+            self.scan()
+            return
+        parts = self.watches.get(wd)
+        if parts is None:
+            return
+        if mask & IN_IGNORED:
+            # Watch removed by the kernel (folder deleted or unmounted)
+            self.watches.pop(wd, None)
+            self.folder_watches.pop(parts, None)
+            return
+        if mask & IN_DELETE_SELF:
+            self.drop_folder(parts)
+            return
+
+        if mask & IN_ISDIR:
+            child = parts + (name,)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # scan() watches the new folder before listing it
+                if not os.path.islink(self.folder_path(child)):
+                    self.scan(child)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.drop_folder(child)
+            return
+
+        folder = self.index.setdefault(parts, {})
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            if folder.pop(name, None) is not None:
+                self.mark_changed()
+        elif mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE):
+            # Re-read on IN_CLOSE_WRITE too: the image header may not exist at IN_CREATE
+            records = self.make_records(parts, [name])
+            if name in records and records[name] != folder.get(name):
+                folder[name] = records[name]
+                self.mark_changed()
+
+    def flush(self):
+        """Write the inventory atomically (temporary file + rename)."""
+        folders = sorted(self.index)
+        records = [self.index[folder][name] for folder in folders for name in sorted(self.index[folder])]
+        directory = os.path.dirname(os.path.abspath(self.output_path))
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+        os.close(fd)
+        try:
+            if self.output_format == "csv":
+                max_levels = max((len(record["levels"]) for record in records), default=0)
+                write_csv(records, temp_path, max_levels, self.dimensions)
+            elif self.output_format == "parquet":
+                write_parquet(records, temp_path, self.dimensions)
+            else:
+                write_jsonl(records, temp_path)
+            # mkstemp creates the file owner-only; give it the mode a plain write would
+            os.chmod(temp_path, self.output_mode())
+            os.replace(temp_path, self.output_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.first_change = self.last_change = None
+        print(f"{time.strftime('%H:%M:%S')} ✅ {len(records)} files written to: {self.output_path}")
+
+    def output_mode(self):
+        """Permissions of the existing output, else the default for new files under the umask."""
+        try:
+            return stat.S_IMODE(os.stat(self.output_path).st_mode)
+        except OSError:
+            return 0o666 & ~self.umask
+
+    def flush_due(self, now):
+        if self.first_change is None:
+            return None
+        return min(self.last_change + self.debounce, self.first_change + self.max_delay) - now
+
+    def stop(self, *_):
+        self.stopped = True
+
+    def run(self):
+        if self.use_inotify:
+            try:
+                self.inotify = Inotify()
+            except OSError as e:
+                print(f"⚠️ inotify unavailable ({e}), polling every {self.poll_interval}s")
+        print(f"Watching: {self.root_dir} ({'inotify' if self.inotify else 'polling'})")
+
+        signal.signal(signal.SIGTERM, self.stop)
+        started = time.perf_counter()
+        self.scan()
+        print(f"Initial scan: {len(self.index)} folders, {sum(map(len, self.index.values()))} files "
+              f"in {time.perf_counter() - started:.2f}s")
+        self.flush()
+
+        next_poll = time.monotonic() + self.poll_interval
+        try:
+            while not self.stopped:
+                now = time.monotonic()
+                due = self.flush_due(now)
+                if due is not None and due <= 0:
+                    self.flush()
+                    continue
+                timeout = min(due if due is not None else 1.0, 1.0)
+
+                if self.inotify is not None:
+                    readable, _, _ = select.select([self.inotify], [], [], timeout)
+                    if readable:
+                        for wd, mask, name in self.inotify.read_events():
+                            self.handle_event(wd, mask, name)
+                            if self.inotify is None:
+                                break
+                else:
+                    time.sleep(timeout)
+                    if time.monotonic() >= next_poll:
+                        self.scan()
+                        next_poll = time.monotonic() + self.poll_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.first_change is not None:
+                self.flush()
+            self.stop_inotify()
+        print("Stopped watching.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory of files in a folder tree, one row per file with its folder levels")
+    parser.add_argument('root', help="Folder to scan")
+    parser.add_argument('-o', '--output', default='inventory.csv',
+                        help="Output file (default: inventory.csv)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        help="Output format (default: from the output file suffix, else csv)")
+    parser.add_argument('-e', '--extensions', nargs='+', default=list(DEFAULT_EXTENSIONS),
+                        help="File extensions to include (default: png jpg); use 'all' for every file")
+    parser.add_argument('-i', '--include', action='append',
+                        help="Glob on the relative path that files must match (repeatable)")
+    parser.add_argument('-x', '--exclude', action='append',
+                        help="Glob on the relative path that excludes files (repeatable)")
+    parser.add_argument('-w', '--workers', type=int, default=8,
+                        help="Threads for listing folders and reading files (default: 8)")
+    parser.add_argument('-s', '--snapshot',
+                        help="SQLite snapshot for incremental rescans of unchanged folders")
+    parser.add_argument('-d', '--duplicates', action='store_true',
+                        help="Hash same-sized files, add a Hash column and a duplicates report")
+    parser.add_argument('-D', '--dimensions', action='store_true',
+                        help="Add image Width/Height read from PNG/JPEG headers")
+    parser.add_argument('-W', '--watch', action='store_true',
+                        help="Keep running: track changes (inotify, else polling) and rewrite the output")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="Watch mode: seconds without changes before the output is rewritten (default: 2)")
+    parser.add_argument('--max-delay', type=float, default=30.0,
+                        help="Watch mode: longest time changes may stay unwritten (default: 30)")
+    parser.add_argument('--poll-interval', type=float, default=30.0,
+                        help="Watch mode: seconds between rescans when inotify isn't available (default: 30)")
+    parser.add_argument('--poll', action='store_true',
+                        help="Watch mode: always poll instead of using inotify")
+    args = parser.parse_args(argv)
+
+    extensions = None if [ext.lower() for ext in args.extensions] == ["all"] else args.extensions
+    if args.watch:
+        if args.duplicates:
+            print("⚠️ --duplicates is not supported in watch mode, ignoring it")
+        InventoryDaemon(args.root, args.output, args.format, extensions, args.include, args.exclude,
+                        args.workers, args.dimensions, args.snapshot, args.debounce, args.max_delay,
+                        args.poll_interval, not args.poll).run()
+        return
+    generate_inventory(args.root, args.output, args.format, extensions, args.include, args.exclude,
+                       args.workers, args.snapshot, args.duplicates, args.dimensions)
 
-        print(f"\n✅ CSV written to: {output_csv}")
-    else:
-        print("\n⚠️ No matching files found under the given directory.")
 
-# 🔁 Update the paths before running
-generate_flexible_csv(
-    r"C:\Users\ramki\Downloads\GME-20250403T050310Z-003",
-    r"C:\Users\ramki\Downloads\GME-20250403T050310Z-003\AI_courses_Img.csv"
-)
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,23 @@ This script reads an Excel sheet and writes each parameter's data to a separate
 where each model's spec value is always stored as a list, even if it has only one item.
 """
 
+import numpy as np
 import pandas as pd
 import argparse
+import csv
+import fnmatch
+import hashlib
+import heapq
 import logging
+import os
 import re
 import json
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # Set up logging
@@ -20,34 +32,746 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+OUTPUT_MODES = ["files", "jsonl", "document", "sqlite"]
+BY_MODEL_MODES = ["files", "jsonl"]
+CONFLICT_RULES = ["first", "last", "union", "error"]
+
+
+class JsonFilesSink:
+    """
+    Writes one pretty-printed JSON file per parameter (the original layout).
+
+    With changed_only=True each payload is hashed and compared against the
+    manifest from the previous run (.spec_manifest.json): unchanged files are
+    not rewritten (mtimes stay put), and files of parameters that disappeared
+    from the sheet are deleted. Filenames listed in deferred_filenames (parameters
+    that occur more than once) are held back until close so only the last
+    payload is compared and written.
+    """
+
+    MANIFEST_FILE = ".spec_manifest.json"
+
+    def __init__(self, output_folder, changed_only=False, deferred_filenames=None):
+        self.output_folder = Path(output_folder)
+        self.changed_only = changed_only
+        self.deferred_filenames = deferred_filenames or set()
+        self.deferred = {}  # filename -> text of the latest payload
+        self.bytes_written = 0
+        self.manifest_file = self.output_folder / self.MANIFEST_FILE
+        self.previous = {}  # filename -> sha256 from the last run
+        self.current = {}   # filename -> sha256 produced by this run
+        self.change_report = None
+        self.debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        if changed_only and self.manifest_file.exists():
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f)
+        # Hash of what is on disk right now, per filename
+        self.on_disk = dict(self.previous)
+        self.filenames = set()  # files produced by this run
+
+    @property
+    def parameters_written(self):
+        """Parameters whose names sanitize alike share (and overwrite) one file"""
+        return len(self.filenames)
+
+    def write(self, parameter_name, model_spec_map):
+        filename = FlexibleExcelExtractor.make_safe_filename(parameter_name) + ".json"
+        self.filenames.add(filename)
+        text = json.dumps({parameter_name: model_spec_map}, indent=2, ensure_ascii=False)
+
+        if filename in self.deferred_filenames:
+            self.deferred[filename] = text
+            return
+        self.write_file(filename, text)
+
+    def write_file(self, filename, text):
+        output_file = self.output_folder / filename
+        payload = text.encode('utf-8')
+
+        if self.changed_only:
+            digest = hashlib.sha256(payload).hexdigest()
+            self.current[filename] = digest
+            if self.on_disk.get(filename) == digest and output_file.exists():
+                if self.debug_enabled:
+                    logger.debug(f"Unchanged JSON file: {output_file}")
+                return
+            self.on_disk[filename] = digest
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        self.bytes_written += len(payload)
+        if self.debug_enabled:
+            logger.debug(f"Created JSON file: {output_file}")
+
+    def close(self):
+        for filename, text in self.deferred.items():
+            self.write_file(filename, text)
+        self.deferred = {}
+
+        if not self.changed_only:
+            return
+
+        # Parameters that disappeared from the sheet
+        removed = sorted(set(self.previous) - set(self.current))
+        for filename in removed:
+            stale_file = self.output_folder / filename
+            if stale_file.exists():
+                stale_file.unlink()
+                logger.info(f"Removed JSON file: {stale_file}")
+
+        added = sum(1 for filename in self.current if filename not in self.previous)
+        changed = sum(1 for filename, digest in self.current.items()
+                      if filename in self.previous and self.previous[filename] != digest)
+        self.change_report = {
+            "added": added,
+            "changed": changed,
+            "unchanged": len(self.current) - added - changed,
+            "removed": len(removed)
+        }
+
+        # Replace the manifest atomically so an interrupted run keeps the old one
+        temp_file = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.current, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.manifest_file)
+
+        logger.info(f"Change report: {self.change_report['added']} added, {self.change_report['changed']} changed, "
+                    f"{self.change_report['unchanged']} unchanged, {self.change_report['removed']} removed")
+
+    def abort(self):
+        """
+        Stop after a failed extraction: files already written stay, but nothing is
+        treated as removed and the previous manifest is kept
+        """
+        self.deferred = {}
+
+
+class IndexedJsonSink:
+    """
+    Streams all parameters into a single file in one pass, plus an offset index
+    (<data file>.index.json) mapping each parameter to [byte offset, byte length]
+    for random access with read_indexed_parameter().
+
+    - "jsonl": specs.jsonl, one {parameter: {model: [lines]}} object per line;
+      the index points at the whole line
+    - "document": specs.json, one JSON object keyed by parameter;
+      the index points at the parameter's value
+    """
+
+    DATA_FILES = {"jsonl": "specs.jsonl", "document": "specs.json"}
+
+    def __init__(self, output_folder, output_mode):
+        self.output_mode = output_mode
+        self.data_file = Path(output_folder) / self.DATA_FILES[output_mode]
+        self.index_file = self.data_file.with_name(self.data_file.name + ".index.json")
+        self.entries = {}
+        self.handle = open(self.data_file, 'wb')
+        self.bytes_written = 0
+
+        if output_mode == "document":
+            self.emit(b"{\n")
+
+    @property
+    def parameters_written(self):
+        return len(self.entries)
+
+    def emit(self, payload):
+        self.handle.write(payload)
+        self.bytes_written += len(payload)
+
+    def write(self, parameter_name, model_spec_map):
+        if self.output_mode == "jsonl":
+            record = json.dumps({parameter_name: model_spec_map}, ensure_ascii=False).encode('utf-8')
+            self.entries[parameter_name] = [self.bytes_written, len(record)]
+            self.emit(record + b"\n")
+            return
+
+        separator = b",\n" if self.bytes_written > 2 else b""
+        key = json.dumps(parameter_name, ensure_ascii=False).encode('utf-8')
+        value = json.dumps(model_spec_map, ensure_ascii=False).encode('utf-8')
+        self.emit(separator + b"  " + key + b": ")
+        self.entries[parameter_name] = [self.bytes_written, len(value)]
+        self.emit(value)
+
+    def close(self):
+        if self.handle is None:
+            return
+        if self.output_mode == "document":
+            self.emit(b"\n}\n")
+        self.handle.close()
+        self.handle = None
+
+        index = {"format": self.output_mode, "data_file": self.data_file.name, "entries": self.entries}
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+
+        logger.info(f"Wrote {len(self.entries)} parameters to {self.data_file} (index: {self.index_file})")
+
+    def abort(self):
+        """Stop after a failed extraction; the index is removed so the partial data file is never read through it"""
+        if self.handle is None:
+            return
+        self.handle.close()
+        self.handle = None
+        self.index_file.unlink(missing_ok=True)
+
+
+class ProgressReporter:
+    """
+    Periodic progress line for long extractions: rows/s, ETA, parameters written
+    and bytes written. The clock is only read every check_every rows, so the
+    per-row cost is a counter increment and a comparison.
+    """
+
+    def __init__(self, total_rows, interval=5.0, stats=None, check_every=256):
+        self.total_rows = total_rows
+        self.interval = interval
+        self.stats = stats or (lambda: {})
+        self.check_every = check_every
+        self.rows = 0
+        self.next_check = check_every
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def advance(self):
+        self.rows += 1
+        if self.rows >= self.next_check:
+            self.next_check = self.rows + self.check_every
+            now = time.perf_counter()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                self.report(now)
+
+    def report(self, now=None):
+        now = now or time.perf_counter()
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.rows / elapsed
+        eta = (self.total_rows - self.rows) / rate if rate else 0.0
+        stats = self.stats()
+        logger.info(
+            f"Progress: {self.rows}/{self.total_rows} rows ({self.rows / max(self.total_rows, 1):.0%}), "
+            f"{rate:,.0f} rows/s, ETA {eta:.1f}s, {stats.get('parameters_written', 0)} parameters, "
+            f"{stats.get('bytes_written', 0):,} bytes written"
+        )
+
+
+def create_sink(output_folder, output_mode, changed_only=False, deferred_filenames=None):
+    """Create the output sink for an output mode"""
+    if output_mode == "files":
+        return JsonFilesSink(output_folder, changed_only, deferred_filenames)
+    if output_mode == "sqlite":
+        return SqliteSink(output_folder)
+    return IndexedJsonSink(output_folder, output_mode)
+
+
+def read_indexed_parameter(index_file, parameter_name):
+    """Read one parameter's {model: [lines]} map from a jsonl/document output via its offset index"""
+    index_file = Path(index_file)
+    with open(index_file, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    offset, length = index["entries"][parameter_name]
+    with open(index_file.with_name(index["data_file"]), 'rb') as f:
+        f.seek(offset)
+        value = json.loads(f.read(length).decode('utf-8'))
+
+    return value[parameter_name] if index["format"] == "jsonl" else value
+
+
+class SqliteSink:
+    """
+    Bulk-loads (parameter, model, line_index, value) rows into specs.sqlite.
+
+    Rows are inserted with executemany in batches inside a single transaction;
+    the parameter/model indexes and the FTS5 full-text index are built once at
+    the end, which is much cheaper than maintaining them during the load.
+
+    The store is built in a temporary file that replaces specs.sqlite only once
+    it is complete, so a failed reload leaves the previous store intact.
+    """
+
+    DATA_FILE = "specs.sqlite"
+
+    def __init__(self, output_folder, batch_size=10000):
+        self.db_file = Path(output_folder) / self.DATA_FILE
+        self.temp_file = self.db_file.with_name(f".{self.DATA_FILE}.tmp")
+        self.batch_size = batch_size
+        self.batch = []
+        self.seen = set()
+        self.rows_written = 0
+        self.bytes_written = 0
+
+        # Journaling is pointless for a scratch file that is discarded on failure
+        self.temp_file.unlink(missing_ok=True)
+        self.connection = sqlite3.connect(self.temp_file, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute("BEGIN")
+        self.connection.execute(
+            "CREATE TABLE specs (parameter TEXT NOT NULL, model TEXT NOT NULL, line_index INTEGER NOT NULL, value TEXT)"
+        )
+
+    @property
+    def parameters_written(self):
+        return len(self.seen)
+
+    def write(self, parameter_name, model_spec_map):
+        if parameter_name in self.seen:
+            # A repeated parameter replaces its earlier row, as its JSON file would
+            self.flush()
+            deleted = self.connection.execute("DELETE FROM specs WHERE parameter = ?", (parameter_name,))
+            self.rows_written -= deleted.rowcount
+        self.seen.add(parameter_name)
+
+        for model, lines in model_spec_map.items():
+            model = str(model)
+            self.batch.extend((parameter_name, model, line_index, line) for line_index, line in enumerate(lines))
+
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.connection.executemany("INSERT INTO specs VALUES (?, ?, ?, ?)", self.batch)
+            self.rows_written += len(self.batch)
+            self.batch = []
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+
+        self.connection.execute("CREATE INDEX idx_specs_parameter ON specs (parameter)")
+        self.connection.execute("CREATE INDEX idx_specs_model ON specs (model)")
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE specs_fts USING fts5(parameter, model, value, content='specs')"
+            )
+            self.connection.execute("INSERT INTO specs_fts (specs_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text index not available ({e}); text queries will use LIKE")
+
+        self.connection.execute("COMMIT")
+        self.connection.close()
+        self.connection = None
+        os.replace(self.temp_file, self.db_file)
+        self.bytes_written = self.db_file.stat().st_size
+
+        logger.info(f"Loaded {self.rows_written} rows for {len(self.seen)} parameters into {self.db_file}")
+
+    def abort(self):
+        """Drop the partial store; the previous specs.sqlite is left untouched"""
+        if self.connection is None:
+            return
+        self.connection.close()
+        self.connection = None
+        self.temp_file.unlink(missing_ok=True)
+        logger.warning(f"Load aborted, {self.db_file} was not changed")
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query that can't be a syntax error: every
+    whitespace-separated term becomes a quoted phrase ("USB-C", "5.0", "Wi-Fi"),
+    and all terms must match.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def query_spec_store(db_file, parameter=None, model=None, text=None, limit=None):
+    """
+    Look up values in a specs.sqlite store.
+    parameter/model are exact matches, text is a full-text (FTS5) search over
+    parameter, model and value where every word must match; punctuation is
+    taken literally. Returns {parameter: {model: [lines]}}.
+    """
+    connection = sqlite3.connect(f"file:{Path(db_file)}?mode=ro", uri=True)
+    try:
+        conditions, arguments = [], []
+        if parameter is not None:
+            conditions.append("specs.parameter = ?")
+            arguments.append(parameter)
+        if model is not None:
+            conditions.append("specs.model = ?")
+            arguments.append(model)
+
+        source = "specs"
+        if text is not None and text.strip():
+            has_fts = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'specs_fts'"
+            ).fetchone() is not None
+            if has_fts:
+                source = "specs JOIN specs_fts ON specs_fts.rowid = specs.rowid"
+                conditions.append("specs_fts MATCH ?")
+                arguments.append(fts_query(text))
+            else:
+                conditions.append("(specs.parameter LIKE ? OR specs.model LIKE ? OR specs.value LIKE ?)")
+                arguments.extend([f"%{text}%"] * 3)
+
+        sql = f"SELECT specs.parameter, specs.model, specs.value FROM {source}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY specs.rowid"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        results = {}
+        for parameter_name, model_name, value in connection.execute(sql, arguments):
+            results.setdefault(parameter_name, {}).setdefault(model_name, []).append(value)
+        return results
+    finally:
+        connection.close()
+
+
+def diff_workbooks(old_file, new_file, sheet_name="Sheet1", new_sheet_name=None, parameter_col=None, skip_cols=1,
+                   include_models=None, exclude_models=None):
+    """
+    Compare two revisions of a spec sheet cell by cell.
+
+    Rows are aligned by parameter and columns by model; the comparison itself is
+    a handful of vectorized array operations over the aligned frames. Returns a
+    report with summary counts, added/removed parameters and models, and one
+    entry per added, removed or changed cell.
+    """
+    start = time.perf_counter()
+    frames = []
+    for excel_file, sheet in ((old_file, sheet_name), (new_file, new_sheet_name or sheet_name)):
+        extractor = FlexibleExcelExtractor(excel_file, sheet, None, parameter_col, skip_cols,
+                                           include_models=include_models, exclude_models=exclude_models)
+        frames.append(extractor.load_spec_frame())
+    old, new = frames
+
+    parameters = old.index.union(new.index, sort=False)
+    models = old.columns.union(new.columns, sort=False)
+    old_values = old.reindex(index=parameters, columns=models, fill_value="").to_numpy(dtype=object)
+    new_values = new.reindex(index=parameters, columns=models, fill_value="").to_numpy(dtype=object)
+
+    old_filled = old_values != ""
+    new_filled = new_values != ""
+    masks = {
+        "added": ~old_filled & new_filled,
+        "removed": old_filled & ~new_filled,
+        "changed": old_filled & new_filled & (old_values != new_values)
+    }
+
+    changes = []
+    for change, mask in masks.items():
+        for row, col in zip(*np.nonzero(mask)):
+            changes.append({
+                "parameter": parameters[row],
+                "model": str(models[col]),
+                "change": change,
+                "old_value": old_values[row, col],
+                "new_value": new_values[row, col]
+            })
+    changes.sort(key=lambda entry: (entry["parameter"], entry["model"]))
+
+    report = {
+        "old_file": str(old_file),
+        "new_file": str(new_file),
+        "summary": {change: int(mask.sum()) for change, mask in masks.items()},
+        "parameters_added": [str(name) for name in new.index.difference(old.index, sort=False)],
+        "parameters_removed": [str(name) for name in old.index.difference(new.index, sort=False)],
+        "models_added": [str(name) for name in new.columns.difference(old.columns, sort=False)],
+        "models_removed": [str(name) for name in old.columns.difference(new.columns, sort=False)],
+        "changes": changes
+    }
+    logger.info(f"Diff: {report['summary']['added']} added, {report['summary']['changed']} changed, "
+                f"{report['summary']['removed']} removed cells in {time.perf_counter() - start:.2f}s")
+    return report
+
+
+def write_diff_report(report, output_file=None, report_format="json"):
+    """Write a diff report as JSON (the whole report) or CSV (one row per cell change)"""
+    handle = open(output_file, 'w', encoding='utf-8', newline='') if output_file else sys.stdout
+    try:
+        if report_format == "csv":
+            writer = csv.DictWriter(handle, fieldnames=["parameter", "model", "change", "old_value", "new_value"])
+            writer.writeheader()
+            writer.writerows(report["changes"])
+        else:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+            handle.write("\n")
+    finally:
+        if output_file:
+            handle.close()
+            logger.info(f"Diff report written to: {output_file}")
+
+
+def diff_main(argv):
+    """diff subcommand: compare two revisions of a spec workbook"""
+    parser = argparse.ArgumentParser(
+        prog="spec_converter.py diff",
+        description="Report added, removed and changed spec cells between two workbooks"
+    )
+    parser.add_argument('old', help="Previous revision of the Excel file")
+    parser.add_argument('new', help="New revision of the Excel file")
+    parser.add_argument('-s', '--sheet', default="Sheet1", help="Sheet name (default: Sheet1)")
+    parser.add_argument('--new-sheet', help="Sheet name in the new workbook, if it differs")
+    parser.add_argument('-p', '--parameter-column', help="Name of the column containing parameter names")
+    parser.add_argument('-k', '--skip-columns', type=int, default=1,
+                        help="Number of initial columns to skip (default: 1)")
+    parser.add_argument('-m', '--models', nargs='+', metavar='PATTERN', help="Only compare these model columns")
+    parser.add_argument('-x', '--exclude-models', nargs='+', metavar='PATTERN', help="Ignore these model columns")
+    parser.add_argument('-o', '--output', help="Report file (default: print to stdout)")
+    parser.add_argument('--format', choices=["json", "csv"],
+                        help="Report format (default: from the output extension, else json)")
+    args = parser.parse_args(argv)
+
+    report_format = args.format or ("csv" if args.output and args.output.lower().endswith(".csv") else "json")
+    report = diff_workbooks(args.old, args.new, args.sheet, args.new_sheet, args.parameter_column,
+                            args.skip_columns, args.models, args.exclude_models)
+    write_diff_report(report, args.output, report_format)
+
+
+def merge_model_maps(parameter_name, model_maps, conflict="last"):
+    """
+    Combine one parameter's {model: [lines]} maps from several workbooks (in workbook order).
+    conflict decides what happens when a model appears in more than one workbook:
+    first/last keep that workbook's lines, union concatenates the distinct lines,
+    error raises if the lines differ.
+    """
+    merged = {}
+    for model_spec_map in model_maps:
+        for model, lines in model_spec_map.items():
+            if model not in merged or conflict == "last":
+                merged[model] = lines
+            elif conflict == "union":
+                merged[model] = merged[model] + [line for line in lines if line not in merged[model]]
+            elif conflict == "error" and merged[model] != lines:
+                raise ValueError(f"Conflicting values for parameter '{parameter_name}', model '{model}'")
+    return merged
+
+
+def write_sorted_run(extractor, run_file):
+    """
+    Spill one workbook's parameters to a JSONL run sorted by parameter name
+    (a repeated parameter keeps its last row, as in single-file extraction).
+    """
+    extractor.read_excel()
+    parameters = dict(extractor.iter_parameters())
+    extractor.data = None
+
+    with open(run_file, 'w', encoding='utf-8') as f:
+        for parameter_name in sorted(parameters):
+            f.write(json.dumps([parameter_name, parameters[parameter_name]], ensure_ascii=False) + "\n")
+    return len(parameters)
+
+
+def read_run(run_file, run_index):
+    """Stream (parameter, run index, model spec map) entries back from a sorted run"""
+    with open(run_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            parameter_name, model_spec_map = json.loads(line)
+            yield parameter_name, run_index, model_spec_map
+
+
+def merge_workbooks(excel_files, output_folder, sheet_name="Sheet1", parameter_col=None, skip_cols=1,
+                    include_models=None, exclude_models=None, output_mode="files", conflict="last"):
+    """
+    Merge the model columns of several spec workbooks per parameter.
+
+    Each workbook is read on its own and spilled to a sorted run file, so only one
+    sheet is held in memory at a time; the runs are then k-way merged by parameter
+    name and each merged parameter is streamed straight to the output sink.
+    """
+    if conflict not in CONFLICT_RULES:
+        raise ValueError(f"Unsupported conflict rule '{conflict}', expected one of {CONFLICT_RULES}")
+
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix=".merge_runs_", dir=output_folder) as run_folder:
+        run_files = []
+        for run_index, excel_file in enumerate(excel_files):
+            extractor = FlexibleExcelExtractor(excel_file, sheet_name, None, parameter_col, skip_cols,
+                                               include_models=include_models, exclude_models=exclude_models)
+            run_file = Path(run_folder) / f"run_{run_index}.jsonl"
+            count = write_sorted_run(extractor, run_file)
+            run_files.append(run_file)
+            logger.info(f"Spilled {count} parameters from {excel_file}")
+
+        sink = create_sink(output_folder, output_mode)
+        merged_count = 0
+        try:
+            runs = [read_run(run_file, run_index) for run_index, run_file in enumerate(run_files)]
+            current_name, current_maps = None, []
+            # heapq.merge orders equal names by run index, i.e. workbook order
+            for parameter_name, _, model_spec_map in heapq.merge(*runs, key=lambda entry: (entry[0], entry[1])):
+                if parameter_name != current_name and current_maps:
+                    sink.write(current_name, merge_model_maps(current_name, current_maps, conflict))
+                    merged_count += 1
+                    current_maps = []
+                current_name = parameter_name
+                current_maps.append(model_spec_map)
+            if current_maps:
+                sink.write(current_name, merge_model_maps(current_name, current_maps, conflict))
+                merged_count += 1
+        except BaseException:
+            sink.abort()
+            raise
+        sink.close()
+
+    logger.info(f"✅ Merged {merged_count} parameters from {len(excel_files)} workbooks into {output_folder}")
+    return merged_count
+
+
+def merge_main(argv):
+    """merge subcommand: combine several spec workbooks into one output"""
+    parser = argparse.ArgumentParser(
+        prog="spec_converter.py merge",
+        description="Merge model columns per parameter across several spec workbooks"
+    )
+    parser.add_argument('inputs', nargs='+', help="Excel files to merge (in priority order for first/last)")
+    parser.add_argument('-s', '--sheet', default="Sheet1", help="Sheet name (default: Sheet1)")
+    parser.add_argument('-o', '--output', default="spec_json", help="Output folder")
+    parser.add_argument('-p', '--parameter-column', help="Name of the column containing parameter names")
+    parser.add_argument('-k', '--skip-columns', type=int, default=1,
+                        help="Number of initial columns to skip (default: 1)")
+    parser.add_argument('-m', '--models', nargs='+', metavar='PATTERN', help="Only merge these model columns")
+    parser.add_argument('-x', '--exclude-models', nargs='+', metavar='PATTERN', help="Ignore these model columns")
+    parser.add_argument('-f', '--output-mode', choices=OUTPUT_MODES, default="files", help="Output format")
+    parser.add_argument('--conflict', choices=CONFLICT_RULES, default="last",
+                        help="When several workbooks have the same parameter and model: keep the first or last "
+                             "workbook's value, union the distinct lines, or fail (default: last)")
+    args = parser.parse_args(argv)
+
+    try:
+        merge_workbooks(args.inputs, args.output, args.sheet, args.parameter_column, args.skip_columns,
+                        args.models, args.exclude_models, args.output_mode, args.conflict)
+    except ValueError as e:
+        logger.error(f"Merge failed: {e}")
+        raise SystemExit(1)
+
+
+def query_main(argv):
+    """query subcommand: look up parameters/models/text in a specs.sqlite store"""
+    parser = argparse.ArgumentParser(
+        prog="spec_converter.py query",
+        description="Query a specs.sqlite store written with --output-mode sqlite"
+    )
+    parser.add_argument('database', help="Path to specs.sqlite")
+    parser.add_argument('-p', '--parameter', help="Exact parameter name")
+    parser.add_argument('-m', '--model', help="Exact model name")
+    parser.add_argument('-t', '--text', help="Full-text query over parameter, model and value")
+    parser.add_argument('-n', '--limit', type=int, help="Maximum number of value rows")
+    args = parser.parse_args(argv)
+
+    if not Path(args.database).exists():
+        parser.error(f"Database not found: {args.database}")
+
+    start = time.perf_counter()
+    results = query_spec_store(args.database, args.parameter, args.model, args.text, args.limit)
+    logger.info(f"Query returned {len(results)} parameters in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
 class FlexibleExcelExtractor:
     """Extracts specifications from Excel with flexible column structure"""
 
-    def __init__(self, excel_file, sheet_name, output_folder, parameter_col=None, skip_cols=1):
+    def __init__(self, excel_file, sheet_name, output_folder, parameter_col=None, skip_cols=1,
+                 include_models=None, exclude_models=None, output_mode="files", changed_only=False,
+                 by_model=None, progress_interval=5.0):
         self.excel_file = Path(excel_file)
         self.sheet_name = sheet_name
-        self.output_folder = Path(output_folder)
+        # output_folder may be None when the extractor is only used to read (diff)
+        self.output_folder = Path(output_folder) if output_folder is not None else None
         self.parameter_col = parameter_col
         self.skip_cols = skip_cols
+        # Model column selection: names or glob patterns, resolved against the header row
+        self.include_models = list(include_models or [])
+        self.exclude_models = list(exclude_models or [])
+        self.projected = False
         self.data = None
+        self.model_columns = []  # (position, model name) resolved once per sheet
+        self.parameter_index = None
+        self.parameters_written = 0
+        self.timings = {}
+        self.progress_interval = progress_interval
+        self.debug_enabled = False
+
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unsupported output mode '{output_mode}', expected one of {OUTPUT_MODES}")
+        self.output_mode = output_mode
+        if changed_only and output_mode != "files":
+            raise ValueError("Change-only rewrites are only available for the files output mode")
+        self.changed_only = changed_only
+        self.sink = None
+        self.change_report = None
+
+        # Optional model -> parameter -> values index built during the same pass
+        if by_model is not None and by_model not in BY_MODEL_MODES:
+            raise ValueError(f"Unsupported by-model mode '{by_model}', expected one of {BY_MODEL_MODES}")
+        self.by_model = by_model
+        self.model_index = {}
+        self.parameter_models = {}  # parameter -> models it was indexed under
 
         if not self.excel_file.exists():
             raise FileNotFoundError(f"Excel file not found: {self.excel_file}")
 
-        self.output_folder.mkdir(parents=True, exist_ok=True)
+        if self.output_folder is not None:
+            self.output_folder.mkdir(parents=True, exist_ok=True)
 
-    def make_safe_filename(self, text):
+    @staticmethod
+    def make_safe_filename(text):
         """Sanitize filename"""
         return re.sub(r'[^\w\s-]', '', text).strip().replace(' ', '_')
 
+    @staticmethod
+    def matches_any(name, patterns):
+        """True if the column name matches one of the names/glob patterns"""
+        return any(fnmatch.fnmatchcase(str(name), pattern) for pattern in patterns)
+
+    def project_columns(self):
+        """
+        Resolve --models include/exclude patterns against the header row alone and
+        return the column positions to read: the parameter column plus selected models.
+        """
+        header = pd.read_excel(
+            self.excel_file,
+            sheet_name=self.sheet_name,
+            header=0,
+            nrows=0,
+            keep_default_na=False
+        ).columns
+
+        if self.parameter_col is None:
+            if len(header) < 2:
+                raise ValueError("Not enough columns in the Excel file")
+            self.parameter_col = header[1]
+            logger.info(f"Auto-selected parameter column: {self.parameter_col}")
+
+        if self.parameter_col not in header:
+            raise ValueError(f"Parameter column '{self.parameter_col}' not found.")
+
+        parameter_position = header.get_loc(self.parameter_col)
+        selected = [
+            col_idx for col_idx, model in enumerate(header)
+            if col_idx > self.skip_cols and model != self.parameter_col
+            and (not self.include_models or self.matches_any(model, self.include_models))
+            and not self.matches_any(model, self.exclude_models)
+        ]
+
+        logger.info(f"Model selection: {len(selected)} of {len(header)} columns match")
+        return sorted([parameter_position] + selected)
+
     def read_excel(self):
         """Read the Excel file and load the sheet"""
         try:
+            usecols = None
+            if self.include_models or self.exclude_models:
+                usecols = self.project_columns()
+                self.projected = True
+
             self.data = pd.read_excel(
                 self.excel_file,
                 sheet_name=self.sheet_name,
                 header=0,
-                keep_default_na=False
+                keep_default_na=False,
+                usecols=usecols
             )
 
             if self.parameter_col is None:
@@ -59,45 +783,90 @@ class FlexibleExcelExtractor:
             if self.parameter_col not in self.data.columns:
                 raise ValueError(f"Parameter column '{self.parameter_col}' not found.")
 
+            self.resolve_columns()
+
             logger.info(f"Loaded sheet '{self.sheet_name}' from {self.excel_file}")
-            logger.info(f"Detected {len(self.data.columns) - self.skip_cols - 1} model columns")
+            logger.info(f"Detected {len(self.model_columns)} model columns")
 
         except Exception as e:
             logger.error(f"Failed to read Excel file: {e}")
             raise
 
-    def process_row(self, row):
-        """Process a single parameter row and write it as JSON"""
-        try:
-            parameter_name = str(row[self.parameter_col]).strip()
-            if not parameter_name or parameter_name.lower() == self.parameter_col.lower():
-                return
+    def resolve_columns(self):
+        """Resolve the parameter column and model column positions once per sheet"""
+        self.parameter_index = self.data.columns.get_loc(self.parameter_col)
+        self.parameter_col_lower = str(self.parameter_col).lower()
+        # A projected read already dropped the skipped and unselected columns
+        first_model_idx = 0 if self.projected else self.skip_cols + 1
+        self.model_columns = [
+            (col_idx, model) for col_idx, model in enumerate(self.data.columns)
+            if col_idx >= first_model_idx and model != self.parameter_col
+        ]
 
-            logger.info(f"Processing parameter: {parameter_name}")
+    def build_model_spec_map(self, row):
+        """Map each model to its spec lines for one row of raw cell values"""
+        model_spec_map = {}
 
-            model_spec_map = {}
+        for col_idx, model in self.model_columns:
+            spec_value = row[col_idx]
+            if not spec_value or str(spec_value).lower() == 'nan':
+                continue
 
-            for col_idx, model in enumerate(self.data.columns):
-                if col_idx <= self.skip_cols or model == self.parameter_col:
-                    continue
+            # Always convert spec value to a list (even if only one item)
+            lines = str(spec_value).split('\n')
+            model_spec_map[model] = [line.strip() for line in lines if line.strip()]
 
-                spec_value = row[model]
-                if not spec_value or str(spec_value).lower() == 'nan':
-                    continue
+        return model_spec_map
 
-                # Always convert spec value to a list (even if only one item)
-                lines = str(spec_value).split('\n')
-                lines = [line.strip() for line in lines if line.strip()]
-                model_spec_map[model] = lines
+    def open_sink(self):
+        """Create the output sink for the configured output mode"""
+        if self.output_mode == "files":
+            deferred_filenames = None
+            if self.changed_only:
+                # Parameters that repeat would otherwise be rewritten once per occurrence
+                counts = Counter(self.make_safe_filename(str(name).strip()) + ".json"
+                                 for name in self.data.values[:, self.parameter_index])
+                deferred_filenames = {filename for filename, count in counts.items() if count > 1}
+            return create_sink(self.output_folder, self.output_mode, self.changed_only, deferred_filenames)
+        return create_sink(self.output_folder, self.output_mode)
 
+    def iter_parameters(self):
+        """Yield (parameter name, model spec map) for every row that would produce output"""
+        for row in self.data.values:
+            parameter_name = str(row[self.parameter_index]).strip()
+            if not parameter_name or parameter_name.lower() == self.parameter_col_lower:
+                continue
+            model_spec_map = self.build_model_spec_map(row)
             if model_spec_map:
-                filename = self.make_safe_filename(parameter_name) + ".json"
-                output_file = self.output_folder / filename
+                yield parameter_name, model_spec_map
 
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump({parameter_name: model_spec_map}, f, indent=2, ensure_ascii=False)
+    def process_row(self, row):
+        """Process a single parameter row (sequence of cell values by position) and write it as JSON"""
+        parameter_name = None
+        try:
+            parameter_name = str(row[self.parameter_index]).strip()
+            if not parameter_name or parameter_name.lower() == self.parameter_col_lower:
+                return
 
-                logger.info(f"Created JSON file: {output_file}")
+            if self.debug_enabled:
+                logger.debug(f"Processing parameter: {parameter_name}")
+
+            model_spec_map = self.build_model_spec_map(row)
+
+            if model_spec_map:
+                write_start = time.perf_counter()
+                self.sink.write(parameter_name, model_spec_map)
+                self.timings["write"] += time.perf_counter() - write_start
+                # Repeated parameters replace their earlier output, so count distinct targets
+                self.parameters_written = self.sink.parameters_written
+
+                if self.by_model is not None:
+                    # A repeated parameter replaces its earlier row, as its parameter file does
+                    for model in self.parameter_models.get(parameter_name, ()):
+                        self.model_index[model].pop(parameter_name, None)
+                    self.parameter_models[parameter_name] = list(model_spec_map)
+                    for model, lines in model_spec_map.items():
+                        self.model_index.setdefault(model, {})[parameter_name] = lines
 
         except Exception as e:
             logger.error(f"Error processing row for parameter '{parameter_name}': {e}")
@@ -106,21 +875,250 @@ class FlexibleExcelExtractor:
     def extract_all(self):
         """Extract specs for all parameters in the sheet"""
         try:
+            start = time.perf_counter()
+            self.debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            self.timings = {"read": 0.0, "extract": 0.0, "write": 0.0, "finalize": 0.0, "total": 0.0}
+
             self.read_excel()
+            self.timings["read"] = time.perf_counter() - start
+
+            self.sink = self.open_sink()
+            rows = self.data.values
+            progress = ProgressReporter(len(rows), self.progress_interval, self.metrics)
+            loop_start = time.perf_counter()
+            try:
+                # Work on the underlying array instead of building a Series per row;
+                # .values keeps the same per-cell objects iterrows() would hand out
+                for row in rows:
+                    self.process_row(row)
+                    progress.advance()
+                self.timings["extract"] = time.perf_counter() - loop_start - self.timings["write"]
+            except BaseException:
+                self.sink.abort()
+                raise
+            finalize_start = time.perf_counter()
+            self.sink.close()
+            self.change_report = getattr(self.sink, "change_report", None)
 
-            for _, row in self.data.iterrows():
-                self.process_row(row)
+            if self.by_model is not None:
+                self.write_model_index()
+            self.timings["finalize"] = time.perf_counter() - finalize_start
+            self.timings["total"] = time.perf_counter() - start
 
-            logger.info("✅ All parameters extracted to JSON successfully.")
+            progress.report()
+            logger.info(f"✅ All parameters extracted to JSON successfully in {self.timings['total']:.2f}s.")
+            return self.parameters_written
 
         except Exception as e:
             logger.error(f"Extraction failed: {e}")
             raise
 
+    def metrics(self):
+        """Counters and timing breakdown (seconds) of the last extraction"""
+        return {
+            "rows": 0 if self.data is None else len(self.data),
+            "parameters_written": self.parameters_written,
+            "bytes_written": getattr(self.sink, "bytes_written", 0),
+            "timings": {name: round(seconds, 4) for name, seconds in self.timings.items()}
+        }
+
+    def write_report(self, report_file):
+        """Write the metrics of the last extraction to a JSON report"""
+        report = {
+            "excel_file": str(self.excel_file),
+            "sheet": self.sheet_name,
+            "output_folder": str(self.output_folder),
+            "output_mode": self.output_mode,
+            "changes": self.change_report,
+            **self.metrics()
+        }
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Run report written to: {report_file}")
+
+    def load_spec_frame(self):
+        """
+        Read the sheet into a parameter x model DataFrame of normalized cell text:
+        the same lines process_row() would produce, joined with newlines, and ""
+        for empty cells. Header-like and empty parameter rows are dropped and a
+        repeated parameter keeps its last row, matching the JSON output.
+        """
+        self.read_excel()
+
+        parameters = self.data.iloc[:, self.parameter_index].astype(str).str.strip()
+        keep = (parameters != "") & (parameters.str.lower() != self.parameter_col_lower)
+
+        columns = {}
+        for col_idx, model in self.model_columns:
+            column = self.data.iloc[:, col_idx]
+            text = column.astype(str)
+            empty = ~column.astype(bool) | (text.str.lower() == 'nan')
+            normalized = text.str.replace(r'\s*\n\s*', '\n', regex=True).str.strip()
+            columns[model] = normalized.where(~empty, "")
+
+        frame = pd.DataFrame(columns, index=self.data.index)
+        frame.index = parameters
+        frame = frame[keep.values]
+        return frame[~frame.index.duplicated(keep="last")]
+
+    def write_model_index(self):
+        """
+        Write the inverted model -> parameter -> values index collected during extraction:
+        either by_model/<model>.json files or a single by_model.jsonl.
+        """
+        if self.by_model == "files":
+            model_folder = self.output_folder / "by_model"
+            model_folder.mkdir(parents=True, exist_ok=True)
+            for model, parameters in self.model_index.items():
+                if not parameters:
+                    continue
+                output_file = model_folder / (self.make_safe_filename(str(model)) + ".json")
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump({str(model): parameters}, f, indent=2, ensure_ascii=False)
+            logger.info(f"Created {len(self.model_index)} model JSON files in {model_folder}")
+        else:
+            output_file = self.output_folder / "by_model.jsonl"
+            with open(output_file, 'w', encoding='utf-8') as f:
+                for model, parameters in self.model_index.items():
+                    if not parameters:
+                        continue
+                    f.write(json.dumps({str(model): parameters}, ensure_ascii=False) + "\n")
+            logger.info(f"Wrote {len(self.model_index)} models to {output_file}")
+
+
+def extract_sheet(options):
+    """Process-pool entry point: extract one sheet and report how long it took"""
+    start = time.perf_counter()
+    extractor = FlexibleExcelExtractor(**options)
+    extractor.extract_all()
+    return {
+        "sheet": options["sheet_name"],
+        "output_folder": str(extractor.output_folder),
+        "parameter_column": str(extractor.parameter_col),
+        "changes": extractor.change_report,
+        **extractor.metrics(),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def sheet_folder_names(sheet_names):
+    """
+    Map each sheet to its own output folder name. Sheets whose safe names collide
+    (e.g. "Region 1" and "Region_1", or names differing only in case) get the
+    sheet's 1-based position appended, so no two workers share a folder; names
+    with nothing left after sanitizing (e.g. "???") become "sheet_<position>".
+    """
+    folders = {}
+    taken = set()
+    for index, sheet_name in enumerate(sheet_names, start=1):
+        folder = FlexibleExcelExtractor.make_safe_filename(sheet_name)
+        if not folder:
+            folder = f"sheet_{index}"
+            logger.warning(f"Sheet '{sheet_name}' has no usable characters for a folder name, using '{folder}'")
+        if folder.lower() in taken:
+            suffix = index
+            while f"{folder}_{suffix}".lower() in taken:
+                suffix += 1
+            logger.warning(f"Sheet '{sheet_name}' maps to an existing folder name, using '{folder}_{suffix}'")
+            folder = f"{folder}_{suffix}"
+        taken.add(folder.lower())
+        folders[sheet_name] = folder
+    return folders
+
+
+def extract_all_sheets(excel_file, output_folder, parameter_col=None, skip_cols=1, max_workers=None,
+                       include_models=None, exclude_models=None, output_mode="files", changed_only=False,
+                       by_model=None, progress_interval=5.0, report_file=None):
+    """
+    Extract every sheet of a workbook on a process pool.
+
+    The workbook is opened once to discover its sheets; each worker then parses
+    only its own sheet and writes to <output_folder>/<sheet name>/. A run report
+    with per-sheet timings is written to report_file (default:
+    <output_folder>/extraction_report.json).
+    """
+    start = time.perf_counter()
+    excel_file = Path(excel_file)
+    output_folder = Path(output_folder)
+
+    if not excel_file.exists():
+        raise FileNotFoundError(f"Excel file not found: {excel_file}")
+
+    with pd.ExcelFile(excel_file) as workbook:
+        sheet_names = workbook.sheet_names
+    if not sheet_names:
+        raise ValueError("No sheets found in the Excel file")
+
+    sheet_folders = sheet_folder_names(sheet_names)
+    max_workers = max_workers or min(len(sheet_names), os.cpu_count() or 1)
+    logger.info(f"Extracting {len(sheet_names)} sheets with {max_workers} workers")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(extract_sheet, {
+                "excel_file": excel_file,
+                "sheet_name": sheet_name,
+                "output_folder": output_folder / sheet_folders[sheet_name],
+                "parameter_col": parameter_col,
+                "skip_cols": skip_cols,
+                "include_models": include_models,
+                "exclude_models": exclude_models,
+                "output_mode": output_mode,
+                "changed_only": changed_only,
+                "by_model": by_model,
+                "progress_interval": progress_interval
+            }): sheet_name
+            for sheet_name in sheet_names
+        }
+
+        for future in as_completed(futures):
+            sheet_name = futures[future]
+            try:
+                result = future.result()
+                result["status"] = "ok"
+                logger.info(f"Sheet '{sheet_name}': {result['parameters_written']} parameters in {result['seconds']}s")
+            except Exception as e:
+                logger.error(f"Sheet '{sheet_name}' failed: {e}")
+                result = {"sheet": sheet_name, "status": "failed", "error": str(e)}
+            results.append(result)
+
+    # Keep the report in workbook order
+    order = {name: idx for idx, name in enumerate(sheet_names)}
+    results.sort(key=lambda result: order[result["sheet"]])
+
+    report = {
+        "excel_file": str(excel_file),
+        "workers": max_workers,
+        "sheets_total": len(sheet_names),
+        "sheets_failed": sum(1 for result in results if result["status"] != "ok"),
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "sheets": results
+    }
+
+    output_folder.mkdir(parents=True, exist_ok=True)
+    report_file = Path(report_file) if report_file else output_folder / "extraction_report.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"Run report written to: {report_file}")
+
+    return report
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["query"]:
+        return query_main(argv[1:])
+    if argv[:1] == ["diff"]:
+        return diff_main(argv[1:])
+    if argv[:1] == ["merge"]:
+        return merge_main(argv[1:])
 
-def main():
     parser = argparse.ArgumentParser(
-        description="Convert Excel spec sheet to JSON files per parameter (array format)"
+        description="Convert Excel spec sheet to JSON files per parameter (array format). "
+                    "Use 'query DATABASE ...' to search a store written with --output-mode sqlite, "
+                    "'diff OLD NEW ...' to compare two workbook revisions, "
+                    "'merge FILE [FILE ...]' to combine several workbooks."
     )
     parser.add_argument(
         '-i', '--input',
@@ -147,19 +1145,114 @@ def main():
         default=1,
         help="Number of initial columns to skip (default: 1)"
     )
+    parser.add_argument(
+        '-a', '--all-sheets',
+        action='store_true',
+        help="Extract every sheet in parallel into per-sheet output folders (ignores --sheet)"
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help="Worker processes for --all-sheets (default: one per sheet, up to the CPU count)"
+    )
+
+    parser.add_argument(
+        '-m', '--models',
+        nargs='+',
+        metavar='PATTERN',
+        help="Only read these model columns (names or glob patterns, e.g. 'X-*')"
+    )
+    parser.add_argument(
+        '-x', '--exclude-models',
+        nargs='+',
+        metavar='PATTERN',
+        help="Skip these model columns (names or glob patterns)"
+    )
+    parser.add_argument(
+        '-f', '--output-mode',
+        choices=OUTPUT_MODES,
+        default="files",
+        help="files: one JSON file per parameter (default); jsonl: specs.jsonl with one parameter per line; "
+             "document: one specs.json keyed by parameter. jsonl/document also write an offset index; "
+             "sqlite: specs.sqlite with indexed (parameter, model, line_index, value) rows, see the query subcommand"
+    )
+    parser.add_argument(
+        '-c', '--changed-only',
+        action='store_true',
+        help="files mode: only rewrite files whose content changed since the last run and delete files "
+             "of parameters that are gone (tracked in .spec_manifest.json)"
+    )
+
+    parser.add_argument(
+        '-b', '--by-model',
+        choices=BY_MODEL_MODES,
+        help="Also write the inverted model -> parameter index from the same pass: "
+             "by_model/<model>.json files or by_model.jsonl"
+    )
+
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=5.0,
+        help="Seconds between progress lines (default: 5)"
+    )
+    parser.add_argument(
+        '-r', '--report',
+        help="Write a JSON run report (counters and read/extract/write/finalize timings) to this file "
+             "(with -a: the all-sheets report, default <output>/extraction_report.json)"
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help="Log every parameter and file (DEBUG level)"
+    )
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+
+    if args.changed_only and args.output_mode != "files":
+        parser.error("--changed-only requires --output-mode files")
+
+    if args.all_sheets:
+        report = extract_all_sheets(
+            excel_file=args.input,
+            output_folder=args.output,
+            parameter_col=args.parameter_column,
+            skip_cols=args.skip_columns,
+            max_workers=args.workers,
+            include_models=args.models,
+            exclude_models=args.exclude_models,
+            output_mode=args.output_mode,
+            changed_only=args.changed_only,
+            by_model=args.by_model,
+            progress_interval=args.progress_interval,
+            report_file=args.report
+        )
+        if report["sheets_failed"]:
+            raise SystemExit(1)
+        return
 
     extractor = FlexibleExcelExtractor(
         excel_file=args.input,
         sheet_name=args.sheet,
         output_folder=args.output,
         parameter_col=args.parameter_column,
-        skip_cols=args.skip_columns
+        skip_cols=args.skip_columns,
+        include_models=args.models,
+        exclude_models=args.exclude_models,
+        output_mode=args.output_mode,
+        changed_only=args.changed_only,
+        by_model=args.by_model,
+        progress_interval=args.progress_interval
     )
 
     extractor.extract_all()
 
+    if args.report:
+        extractor.write_report(args.report)
+
 
 if __name__ == "__main__":
     main()